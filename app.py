@@ -7,7 +7,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_caching import Cache
-from rwrs import helpers, motd
+from rwrs import helpers
 from datetime import datetime
 from environs import Env
 import ipaddress
@@ -74,9 +74,20 @@ app.config.update(
     BANNED_IPS_FILE = env.str('BANNED_IPS_FILE', default=None),
 
     SERVERS_CACHE_TIMEOUT=env.int('SERVERS_CACHE_TIMEOUT', default=60),
+    SERVERS_FETCH_CONCURRENCY=env.int('SERVERS_FETCH_CONCURRENCY', default=4),
+    SERVERS_REFRESH_INTERVAL=env.int('SERVERS_REFRESH_INTERVAL', default=30),
     PLAYERS_CACHE_TIMEOUT=env.int('PLAYERS_CACHE_TIMEOUT', default=60),
+    PLAYERS_MIRROR_SIZE=env.int('PLAYERS_MIRROR_SIZE', default=1000),
+    PLAYERS_MIRROR_CACHE_TIMEOUT=env.int('PLAYERS_MIRROR_CACHE_TIMEOUT', default=15 * 60),
+    PLAYERS_REFRESH_INTERVAL=env.int('PLAYERS_REFRESH_INTERVAL', default=10 * 60),
+    PLAYERS_REQUESTED_SORTS_TIMEOUT=env.int('PLAYERS_REQUESTED_SORTS_TIMEOUT', default=60 * 60 * 24),
+    PLAYERS_FETCH_CONCURRENCY=env.int('PLAYERS_FETCH_CONCURRENCY', default=4),
     GRAPHS_DATA_CACHE_TIMEOUT=env.int('GRAPHS_DATA_CACHE_TIMEOUT', default=60),
+    PLAYERS_EVOLUTION_CACHE_TIMEOUT=env.int('PLAYERS_EVOLUTION_CACHE_TIMEOUT', default=60 * 60 * 24),
+    GRAPHS_DATA_PERIOD=env.int('GRAPHS_DATA_PERIOD', default=60 * 60), # One of the ServerPlayerCountRollup periods
     STEAM_PLAYERS_CACHE_TIMEOUT=env.int('STEAM_PLAYERS_CACHE_TIMEOUT', default=60),
+    HEADER_CACHE_TIMEOUT=env.int('HEADER_CACHE_TIMEOUT', default=60),
+    HEADER_NOTICES_CACHE_TIMEOUT=env.int('HEADER_NOTICES_CACHE_TIMEOUT', default=15), # Also how late an event is shown as ongoing
 
     STEAM_API_KEY=env.str('STEAM_API_KEY'),
 
@@ -97,6 +108,9 @@ app.config.update(
     ADMINS=env.list('ADMINS', default=[]),
 
     SCRAPER_PROXY=env.str('SCRAPER_PROXY', default=None),
+    SCRAPER_LOCK_TIMEOUT=env.int('SCRAPER_LOCK_TIMEOUT', default=30),
+    SCRAPER_LOCKS_DIR=env.str('SCRAPER_LOCKS_DIR', default='instance/locks'),
+    SCRAPER_MAX_STALENESS=env.int('SCRAPER_MAX_STALENESS', default=60 * 60),
 
     RANKS_IMAGES_DIR='static/images/ranks',
     RANKS_DATA_FILE='data/ranks.json',
@@ -243,8 +257,7 @@ def before_request():
             if ban:
                 return 'gtfo', 403, {'Content-Type': 'text/plain'}
 
-    from rwrs.models import Variable
-    import rwr.scraper
+    from rwrs import header
 
     if request.endpoint and request.endpoint.startswith(('static', 'debugtoolbar', '_debug_toolbar')):
         return
@@ -254,8 +267,10 @@ def before_request():
     if request.endpoint and request.endpoint in ('dynamic_player_image', 'dynamic_server_image'):
         return
 
-    g.MOTD = motd.get()
-    g.EVENT = Variable.get_event()
+    notices = header.get_notices()
+
+    g.MOTD = notices.motd
+    g.EVENT = notices.event
 
     if request.path == app.config['DISCORD_INTERACTIONS_PATH']:
         return
@@ -265,14 +280,12 @@ def before_request():
     if g.UNDER_MAINTENANCE:
         abort(503)
 
-    online_players, active_servers, total_servers = rwr.scraper.get_counters()
-
-    from rwrs.steam_helpers import get_current_players_count_for_app
+    header_data = header.get()
 
-    g.total_players = get_current_players_count_for_app(app.config['RWR_STEAM_APP_ID'])
-    g.online_players = online_players
-    g.active_servers = active_servers
-    g.total_servers = total_servers
+    g.total_players = header_data.total_players
+    g.online_players = header_data.online_players
+    g.active_servers = header_data.active_servers
+    g.total_servers = header_data.total_servers
 
 # -----------------------------------------------------------
 # Context processors
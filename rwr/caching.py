@@ -0,0 +1,174 @@
+from flask import g, has_app_context
+from functools import wraps
+from app import app, cache
+import threading
+import hashlib
+import fcntl
+import time
+import os
+
+WAIT_INTERVAL = 0.1 # Seconds between two checks when waiting for another worker to fill the cache
+LOCK_FILES = 256 # Cache keys are spread over this many lock files, as they may come from user input
+
+
+class Lock:
+    """Lock shared by all processes of the host, held through flock() on one of the LOCK_FILES files, picked by hashing the
+    given cache key (unrelated keys may thus share a lock). Lock files are never deleted.
+
+    The kernel releases it as soon as its file is closed, even if the process holding it dies."""
+    def __init__(self, key):
+        self.path = os.path.join(
+            app.config['SCRAPER_LOCKS_DIR'],
+            '{}.lock'.format(int(hashlib.md5(key.encode()).hexdigest(), 16) % LOCK_FILES)
+        )
+        self.fd = None
+
+    def acquire(self):
+        """Try to acquire the lock without blocking. Return whether it was acquired."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+
+            return False
+
+        self.fd = fd
+
+        return True
+
+    def release(self):
+        if self.fd is None:
+            return
+
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+        self.fd = None
+
+
+def _failed_key(key):
+    """Return the cache key flagging the given cache key as having failed to be refreshed recently."""
+    return key + ':failed'
+
+
+def _stale_key(key):
+    """Return the cache key of the last known good copy of the given cache key."""
+    return key + ':stale'
+
+
+def remember(key, value, timeout=0):
+    """Keep the given value as the last known good copy of the given cache key, along with when it expires (given its
+    cache timeout), then return it."""
+    if value is not None:
+        cache.set(_stale_key(key), (time.time() + timeout, value), timeout=app.config['SCRAPER_MAX_STALENESS'])
+
+    return value
+
+
+def store(key, value, timeout):
+    """Cache the given value under the given key, also keeping it as its last known good copy."""
+    cache.set(key, value, timeout=timeout)
+
+    return remember(key, value, timeout)
+
+
+def _serve_stale(key, stale):
+    """Return the value of the given last known good copy of the given cache key.
+
+    The current request is only flagged as being served a stale copy if refreshing it failed recently, or if it expired
+    for longer than a refresh should take (SCRAPER_LOCK_TIMEOUT): routine background refreshes are silent."""
+    expires_at, value = stale
+
+    if has_app_context() and (cache.has(_failed_key(key)) or time.time() > expires_at + app.config['SCRAPER_LOCK_TIMEOUT']):
+        g.STALE_DATA = True
+
+    return value
+
+
+def _compute_in_background(key, lock, compute):
+    """Call compute() in the background, releasing the given (acquired) lock once done.
+
+    On failure the given cache key is flagged as such for SCRAPER_LOCK_TIMEOUT seconds, so upstream isn't retried more
+    than once every lock timeout."""
+    def run():
+        try:
+            with app.app_context():
+                try:
+                    compute()
+                except Exception:
+                    app.logger.exception('Error refreshing ' + key)
+
+                    cache.set(_failed_key(key), True, timeout=app.config['SCRAPER_LOCK_TIMEOUT'])
+        finally:
+            lock.release()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def single_flight(key, compute):
+    """Return the value cached under the given key.
+
+    On a cache miss, only the worker which manages to acquire the lock calls compute() (which is responsible of caching
+    its result using store() or remember()). The lock is a file lock so it is shared by all processes of the host. If a
+    last known good copy exists, it is immediately returned (see _serve_stale()) to everyone while the lock owner
+    refreshes the value in the background. Otherwise, the other workers wait for the lock owner to finish instead of
+    hitting upstream as well."""
+    rv = cache.get(key)
+
+    if rv is not None:
+        return rv
+
+    lock = Lock(key)
+    stale = cache.get(_stale_key(key))
+
+    if stale is not None:
+        if not cache.has(_failed_key(key)) and lock.acquire():
+            _compute_in_background(key, lock, compute)
+
+        return _serve_stale(key, stale)
+
+    if lock.acquire():
+        try:
+            return compute()
+        finally:
+            lock.release()
+
+    deadline = time.monotonic() + app.config['SCRAPER_LOCK_TIMEOUT']
+
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+
+        rv = cache.get(key)
+
+        if rv is not None:
+            return rv
+
+        if lock.acquire(): # The other worker is done
+            try:
+                if cache.has(key): # None results are cached as well
+                    return cache.get(key)
+
+                return compute() # It failed: let's try ourselves
+            finally:
+                lock.release()
+
+    return compute()
+
+
+def single_flight_memoized(f):
+    """Decorate a function memoized by Flask-Caching so concurrent cache misses only result in one call to it, stale
+    results being served in the meantime if available.
+
+    Cache misses are handled by single_flight() only: the undecorated function is called and its result stored under
+    the memoize cache key, so delete_memoized() keeps working."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = f.make_cache_key(f.uncached, *args, **kwargs)
+
+        return single_flight(key, lambda: store(key, f.uncached(*args, **kwargs), f.cache_timeout))
+
+    return decorated
@@ -1,9 +1,7 @@
 from sqlalchemy.util import memoized_property
-from flask import url_for, current_app
 from rwrs.models import RwrAccount
 from rwr import constants, utils
 from rwrs import helpers
-from app import app
 
 
 class Player:
@@ -12,53 +10,28 @@ class Player:
         self._rwr_account = None
 
     @classmethod
-    def load(cls, database, node, alternative=False):
-        """Load a player data from an HTML <tr> node."""
+    def load(cls, database, row, alternative=False):
+        """Load a player data from the cells text of an HTML <tr> row."""
         ret = cls()
 
-        leaderboard_position_node = node[0]
-        username_node = node[1]
-        kills_node = node[2]
-        deaths_node = node[3]
-        score_node = node[4]
-        kd_ratio_node = node[5]
-        time_played_node = node[6]
-        longest_kill_streak_node = node[8 if alternative else 7]
-        targets_destroyed_node = node[9 if alternative else 8]
-        vehicles_destroyed_node = node[10 if alternative else 9]
-        soldiers_healed_node = node[11 if alternative else 10]
-        teamkills_node = node[7 if alternative else 11]
-        distance_moved_node = node[12]
-        shots_fired_node = node[13]
-        throwables_thrown_node = node[14]
-        xp_node = node[15]
-
         ret.database = database
 
-        ret.leaderboard_position = int(leaderboard_position_node.text)
-        ret.username = username_node.text.encode('iso-8859-1').decode('utf-8')
-        ret.kills = int(kills_node.text)
-        ret.deaths = int(deaths_node.text)
-        ret.score = int(score_node.text)
-        ret.kd_ratio = float(kd_ratio_node.text)
-        ret.time_played = utils.parse_time(time_played_node.text)
-        ret.longest_kill_streak = int(longest_kill_streak_node.text)
-        ret.targets_destroyed = int(targets_destroyed_node.text)
-        ret.vehicles_destroyed = int(vehicles_destroyed_node.text)
-        ret.soldiers_healed = int(soldiers_healed_node.text)
-        ret.teamkills = int(teamkills_node.text)
-        ret.distance_moved = float(distance_moved_node.text.replace('km', ''))
-        ret.shots_fired = int(shots_fired_node.text)
-        ret.throwables_thrown = int(throwables_thrown_node.text)
-        ret.xp = int(xp_node.text)
-
-        if current_app:
-            ret.set_links()
-            ret.set_images()
-        else:
-            with app.app_context():
-                ret.set_links()
-                ret.set_images()
+        ret.leaderboard_position = int(row[0])
+        ret.username = row[1]
+        ret.kills = int(row[2])
+        ret.deaths = int(row[3])
+        ret.score = int(row[4])
+        ret.kd_ratio = float(row[5])
+        ret.time_played = utils.parse_time(row[6])
+        ret.longest_kill_streak = int(row[8 if alternative else 7])
+        ret.targets_destroyed = int(row[9 if alternative else 8])
+        ret.vehicles_destroyed = int(row[10 if alternative else 9])
+        ret.soldiers_healed = int(row[11 if alternative else 10])
+        ret.teamkills = int(row[7 if alternative else 11])
+        ret.distance_moved = float(row[12].replace('km', ''))
+        ret.shots_fired = int(row[13])
+        ret.throwables_thrown = int(row[14])
+        ret.xp = int(row[15])
 
         return ret
 
@@ -88,14 +61,6 @@ class Player:
         ret.throwables_thrown = rwr_account_stat.throwables_thrown
         ret.xp = rwr_account_stat.xp
 
-        if current_app:
-            ret.set_links()
-            ret.set_images()
-        else:
-            with app.app_context():
-                ret.set_links()
-                ret.set_images()
-
         return ret
 
     @memoized_property
@@ -170,36 +135,29 @@ class Player:
     def xp_display(self):
         return helpers.humanize_integer(self.xp)
 
-    def set_links(self):
-        """Set the relative and absolute URLs of this player's details page."""
-        params = {
-            'database': self.database,
-            'username': self.username
-        }
+    @memoized_property
+    def link(self):
+        """Relative URL of this player's details page."""
+        return utils.build_url('player_details', database=self.database, username=self.username)
 
-        self.link = url_for('player_details', **params)
-        self.link_absolute = url_for('player_details', **params, _external=True)
+    @memoized_property
+    def link_absolute(self):
+        """Absolute URL of this player's details page."""
+        return utils.build_url('player_details', database=self.database, username=self.username, _external=True)
 
-    def set_images(self):
-        """Set the relative and absolute URLs to the images of this Player."""
-        params = {
-            'database': self.database,
-            'username': self.username
-        }
+    @memoized_property
+    def signature(self):
+        """Relative URL to the signature image of this player."""
+        return utils.build_url('dynamic_player_image', database=self.database, username=self.username)
 
-        self.signature = url_for('dynamic_player_image', **params)
-        self.signature_absolute = url_for('dynamic_player_image', **params, _external=True)
+    @memoized_property
+    def signature_absolute(self):
+        """Absolute URL to the signature image of this player."""
+        return utils.build_url('dynamic_player_image', database=self.database, username=self.username, _external=True)
 
     def set_playing_on_server(self, servers):
-        """Determine if this user is playing on one of the given servers."""
-        for server in servers:
-            if not server.players.list:
-                continue
-
-            if self.username in server.players.list:
-                self.playing_on_server = server
-
-                return
+        """Determine if this user is playing on one of the given servers (a ServerList)."""
+        self.playing_on_server = servers.get_by_player(self.username)
 
     @memoized_property
     def display_time_played_in_days(self):
@@ -304,17 +262,30 @@ class PlayerRank:
     def name_display(self):
         return self.name
 
-    def set_images_and_icons(self):
-        """Set the relative and absolute URLs to the images and icon of this rank."""
-        params = {
-            'rank_id': self.id
-        }
+    def _get_image_url(self, suffix='', external=False):
+        """Return the URL to the image or icon of this rank."""
+        if self.id is None:
+            return None
 
-        image_url = 'images/ranks/{rank_id}.png'.format(**params)
-        icon_url = 'images/ranks/{rank_id}_icon.png'.format(**params)
+        image_url = 'images/ranks/{rank_id}{suffix}.png'.format(
+            rank_id=self.id,
+            suffix=suffix
+        )
 
-        self.image = url_for('static', filename=image_url)
-        self.image_absolute = url_for('static', filename=image_url, _external=True)
+        return utils.build_url('static', filename=image_url, _external=external)
 
-        self.icon = url_for('static', filename=icon_url)
-        self.icon_absolute = url_for('static', filename=icon_url, _external=True)
+    @memoized_property
+    def image(self):
+        return self._get_image_url()
+
+    @memoized_property
+    def image_absolute(self):
+        return self._get_image_url(external=True)
+
+    @memoized_property
+    def icon(self):
+        return self._get_image_url('_icon')
+
+    @memoized_property
+    def icon_absolute(self):
+        return self._get_image_url('_icon', external=True)
@@ -1,14 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from steam.steamid import SteamID
 from rwrs.models import Variable
-from flask import current_app
-from rwr.server import Server
+from collections import deque
+from functools import lru_cache, partial
+from rwr.server import Server, ServerList
 from rwr.player import Player
 from lxml import html, etree
 from app import app, cache
-from rwr import constants
+from rwr import constants, caching
+from rwrs import header
 import geoip2.database
 import geoip2.errors
+import threading
 import requests
+import sys
+import os
 
 requests = requests.Session()
 
@@ -21,8 +27,16 @@ if app.config['SCRAPER_PROXY']:
 servers_base_url = 'http://rwr.runningwithrifles.com/rwr_server_list/'
 players_base_url = 'http://rwr.runningwithrifles.com/rwr_stats/'
 
+SERVERS_CACHE_KEY = 'rwr_servers'
+PLAYERS_BLOCK_SIZE = 100 # Players lists are fetched and cached by blocks of this many rows
+PLAYERS_REQUESTED_SORT_CACHE_KEY = 'rwr_players_requested_sort:{}:{}'
 
-def _call(url, parser=None, params=None, auth=None, verify=True):
+_geoip_db_lookup = None # _get_ip_location() bound to the current GeoIP database reader, with a LRU cache keyed on IPs
+_geoip_db_mtime = None
+_geoip_db_lock = threading.Lock()
+
+
+def _get(url, params=None, auth=None, verify=True, stream=False):
     """Perform an HTTP GET request to the desired RWR list base_url."""
     headers = {
         'User-Agent': 'rwrstats.com'
@@ -34,75 +48,147 @@ def _call(url, parser=None, params=None, auth=None, verify=True):
         auth=auth,
         headers=headers,
         verify=verify,
-        timeout=5
+        timeout=5,
+        stream=stream
     )
 
     response.raise_for_status()
 
+    return response
+
+
+def _call(url, parser=None, params=None, auth=None, verify=True):
+    """Perform an HTTP GET request to the desired RWR list base_url, then parse the response."""
+    response = _get(url, params=params, auth=auth, verify=verify)
+
     if parser == 'html':
         return html.fromstring(response.text)
     elif parser == 'xml':
         return etree.fromstring(response.text)
 
 
+def _iter_xml(url, tag, params=None):
+    """Perform an HTTP GET request to the desired RWR list base_url, then incrementally parse the XML response while it
+    is received, yielding every element of the given tag as soon as it is complete.
+
+    Yielded elements (and the ones preceding them) are cleared afterwards so memory usage stays flat."""
+    with _get(url, params=params, stream=True) as response:
+        response.raw.decode_content = True
+
+        # Use the encoding response.text would use (if known from the headers) so decoding is unchanged
+        for _, element in etree.iterparse(response.raw, events=('end',), tag=tag, encoding=response.encoding):
+            yield element
+
+            element.clear()
+
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def _iter_html_rows(url, params=None):
+    """Perform an HTTP GET request to the desired RWR list base_url, then parse the HTML response in one pass while it is
+    received, yielding the cells text of every table row (first one excluded as it's the header) as a tuple."""
+    with _get(url, params=params, stream=True) as response:
+        response.raw.decode_content = True
+
+        # Lists are served as UTF-8 without any charset in the headers, so decode them straight from bytes
+        for _, row in etree.iterparse(response.raw, events=('end',), tag='tr', html=True, encoding='utf-8'):
+            parent = row.getparent()
+
+            if parent is not None and parent.tag == 'table' and row.getprevious() is not None:
+                yield tuple(cell.text for cell in row)
+
+            row.clear()
+
+
+def _get_geoip_db_lookup():
+    """Return the process-wide function returning the location of an IP, cached, (re)opening the GeoIP database if its
+    file changed on disk.
+
+    The former database reader isn't closed as lookups may still be using it: it is left to the garbage collector along
+    with its cache."""
+    global _geoip_db_lookup, _geoip_db_mtime
+
+    geoip_db_mtime = os.path.getmtime(app.config['GEOIP_DATABASE_FILE'])
+
+    with _geoip_db_lock:
+        if not _geoip_db_lookup or geoip_db_mtime != _geoip_db_mtime:
+            geoip_db_reader = geoip2.database.Reader(app.config['GEOIP_DATABASE_FILE'], mode=geoip2.database.MODE_MMAP)
+
+            _geoip_db_lookup = lru_cache(maxsize=2048)(partial(_get_ip_location, geoip_db_reader))
+            _geoip_db_mtime = geoip_db_mtime
+
+        return _geoip_db_lookup
+
+
+def _get_ip_location(geoip_db_reader, ip):
+    """Return the continent code and name, country code and name and city name of the given IP, if known by the given
+    GeoIP database reader."""
+    try:
+        location = geoip_db_reader.city(ip)
+    except (ValueError, geoip2.errors.AddressNotFoundError):
+        return None
+
+    if not location:
+        return None
+
+    continent_code = continent_name = country_code = country_name = city_name = None
+
+    if location.continent.geoname_id:
+        continent_code = sys.intern(location.continent.code.lower())
+        continent_name = sys.intern(location.continent.names['en'])
+
+    if location.country.geoname_id:
+        country_code = sys.intern(location.country.iso_code.lower())
+        country_name = sys.intern(location.country.names['en'])
+
+    if location.city.geoname_id:
+        city_name = sys.intern(location.city.names['en'])
+
+    return continent_code, continent_name, country_code, country_name, city_name
+
+
 def _set_servers_location(servers):
     """Set the location of a list of servers."""
     if not servers:
         return
 
-    geoip_db_reader = geoip2.database.Reader(app.config['GEOIP_DATABASE_FILE'])
+    get_ip_location = _get_geoip_db_lookup()
 
     for server in servers:
-        try:
-            location = geoip_db_reader.city(server.ip)
-        except (ValueError, geoip2.errors.AddressNotFoundError):
-            continue
+        location = get_ip_location(server.ip)
 
-        if location:
-            if location.continent.geoname_id:
-                server.location.continent_code = location.continent.code.lower()
-                server.location.continent_name = location.continent.names['en']
-
-            if location.country.geoname_id:
-                server.location.country_code = location.country.iso_code.lower()
-                server.location.country_name = location.country.names['en']
-
-            if location.city.geoname_id:
-                server.location.city_name = location.city.names['en']
-
-            server.location.text = '{}{}'.format(
-                server.location.city_name + ', ' if server.location.city_name else '',
-                server.location.country_name
-            )
-
-            if current_app:
-                server.location.set_flags()
-            else:
-                with app.app_context():
-                    server.location.set_flags()
+        if not location:
+            continue
 
-    geoip_db_reader.close()
+        (
+            server.location.continent_code,
+            server.location.continent_name,
+            server.location.country_code,
+            server.location.country_name,
+            server.location.city_name
+        ) = location
+
+        server.location.text = '{}{}'.format(
+            server.location.city_name + ', ' if server.location.city_name else '',
+            server.location.country_name
+        )
 
 
-def _get_list(value_attribute, label_attribute):
+def _get_list(servers, value_attribute, label_attribute):
     """Return a list of value -> label of the specified servers attributes."""
-    servers = get_servers()
-    ret = []
-    already_handled = []
+    ret = {}
 
     for server in servers:
         value = value_attribute(server)
-        label = label_attribute(server)
 
-        if value and value not in already_handled:
-            ret.append({
+        if value and value not in ret:
+            ret[value] = {
                 'value': value,
-                'label': label
-            })
-
-            already_handled.append(value)
+                'label': label_attribute(server)
+            }
 
-    return sorted(ret, key=lambda k: k['label'])
+    return sorted(ret.values(), key=lambda k: k['label'])
 
 
 def _set_server_event(servers):
@@ -116,38 +202,65 @@ def _set_server_event(servers):
         server.event = event if event and event['server_ip_and_port'] and event['server_ip_and_port'] == server.ip_and_port else None
 
 
-@cache.memoize(timeout=app.config['SERVERS_CACHE_TIMEOUT'])
-def get_servers():
-    """Get and parse the list of all public RWR servers."""
+def _get_servers_page(start, size):
+    """Get and parse one page of the list of all public RWR servers."""
+    params = {
+        'start': start,
+        'size': size,
+        'names': 1,
+        'cdata': 1
+    }
+
+    server_nodes = _iter_xml(
+        servers_base_url + 'get_server_list.php',
+        'server',
+        params=params
+    )
+
+    return [Server.load(server_node) for server_node in server_nodes]
+
+
+def _get_servers_pages(size=100):
+    """Get and parse all the pages of the list of all public RWR servers, fetching several of them at once.
+
+    Pages are requested ahead of time by a pool of threads but are consumed in order, so the first page
+    flagged as being the last one (or the first empty page) stops the whole process."""
+    concurrency = max(app.config['SERVERS_FETCH_CONCURRENCY'], 1)
     all_servers = []
-    start = 0
-    size = 100
 
-    while True:
-        params = {
-            'start': start,
-            'size': size,
-            'names': 1,
-            'cdata': 1
-        }
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending_pages = deque()
+        next_start = 0
 
-        xml_content = _call(
-            servers_base_url + 'get_server_list.php',
-            parser='xml',
-            params=params
-        )
+        for _ in range(concurrency):
+            pending_pages.append(executor.submit(_get_servers_page, next_start, size))
 
-        servers = [Server.load(server_node) for server_node in xml_content.xpath('/result/server')]
+            next_start += size
 
-        if not servers:
-            break
+        while pending_pages:
+            servers = pending_pages.popleft().result()
 
-        all_servers.extend(servers)
+            if not servers:
+                break
 
-        if servers[-1].is_last:
-            break
+            all_servers.extend(servers)
+
+            if servers[-1].is_last:
+                break
+
+            pending_pages.append(executor.submit(_get_servers_page, next_start, size))
+
+            next_start += size
 
-        start += size
+        for pending_page in pending_pages:
+            pending_page.cancel()
+
+    return all_servers
+
+
+def refresh_servers():
+    """Get and parse the list of all public RWR servers, then atomically replace the cached copy with it."""
+    all_servers = ServerList(_get_servers_pages())
 
     _set_servers_location(all_servers)
     _set_server_event(all_servers)
@@ -157,49 +270,72 @@ def get_servers():
         reverse=True
     )
 
+    all_servers.build_indexes()
+
+    all_servers.counters = (
+        sum(server.players.current for server in all_servers),
+        sum(1 for server in all_servers if server.players.current > 0),
+        len(all_servers)
+    )
+
+    all_servers.facets = {
+        'locations': _compute_servers_locations(all_servers),
+        'types': _compute_servers_types(all_servers),
+        'modes': _compute_servers_modes(all_servers),
+        'maps': _compute_servers_maps(all_servers),
+    }
+
+    caching.store(SERVERS_CACHE_KEY, all_servers, app.config['SERVERS_CACHE_TIMEOUT'])
+
+    header.clear()
+
     return all_servers
 
 
+def refresh_servers_event():
+    """Assign the next RWR event to the cached list of servers without scraping it again."""
+    servers = cache.get(SERVERS_CACHE_KEY)
+
+    if servers is None:
+        return
+
+    _set_server_event(servers)
+
+    caching.store(SERVERS_CACHE_KEY, servers, app.config['SERVERS_CACHE_TIMEOUT'])
+
+
+def get_servers():
+    """Return the list of all public RWR servers.
+
+    The list is normally kept warm by the refresh_servers command. It is only scraped here if no copy is cached, by a
+    single worker at once."""
+    return caching.single_flight(SERVERS_CACHE_KEY, refresh_servers)
+
+
 def get_server_by_ip_and_port(*args):
     """Search for a RWR public server based on its IP and port."""
     if len(args) == 1:
-        def server_found(*args):
-            server, ip_and_port = args
+        ip, _, port = args[0].rpartition(':')
 
-            return server.ip_and_port == ip_and_port
+        try:
+            port = int(port)
+        except ValueError:
+            return None
     elif len(args) == 2:
-        def server_found(*args):
-            server, ip, port = args
-
-            return server.ip == ip and server.port == port
+        ip, port = args
     else:
         raise ValueError('get_server_by_ip_and_port takes either one IP:port string argument or two IP (string) and port (int) arguments')
 
-    servers = get_servers()
-
-    for server in servers:
-        if server_found(server, *args):
-            return server
-
-    return None
+    return get_servers().get_by_ip_and_port(ip, port)
 
 
 def get_server_by_name(name):
     """Search for a RWR public server based on its name (partial match)."""
-    servers = get_servers()
-
-    name = name.lower()
-
-    for server in servers:
-        if name in server.name.lower():
-            return server
+    return get_servers().search_by_name(name)
 
-    return None
 
-
-def get_all_servers_locations():
-    """Return the location of all the servers."""
-    servers = get_servers()
+def _compute_servers_locations(servers):
+    """Return the location of all the given servers."""
     locations = {}
 
     for server in servers:
@@ -246,9 +382,10 @@ def get_all_servers_locations():
     return ret
 
 
-def get_all_servers_types():
-    """Return the type of all of the servers."""
+def _compute_servers_types(servers):
+    """Return the type of all of the given servers."""
     ret = _get_list(
+        servers,
         lambda server: server.type if server.type not in ['vanilla.winter', 'vanilla.desert', 'pvp'] else False,
         lambda server: server.type_name
     )
@@ -262,17 +399,17 @@ def get_all_servers_types():
     return ret
 
 
-def get_all_servers_modes():
-    """Return the mode of all of the servers."""
+def _compute_servers_modes(servers):
+    """Return the mode of all of the given servers."""
     return _get_list(
+        servers,
         lambda server: server.mode,
         lambda server: server.mode_name_long
     )
 
 
-def get_all_servers_maps():
-    """Return the map of all of the servers."""
-    servers = get_servers()
+def _compute_servers_maps(servers):
+    """Return the map of all of the given servers."""
     maps = {}
 
     for server in servers:
@@ -315,104 +452,175 @@ def get_all_servers_maps():
     return sorted(ret, key=lambda k: k['label'])
 
 
+def get_all_servers_locations(servers=None):
+    """Return the location of all the servers, computed once per servers list."""
+    return (servers if servers is not None else get_servers()).facets['locations']
+
+
+def get_all_servers_types(servers=None):
+    """Return the type of all of the servers, computed once per servers list."""
+    return (servers if servers is not None else get_servers()).facets['types']
+
+
+def get_all_servers_modes(servers=None):
+    """Return the mode of all of the servers, computed once per servers list."""
+    return (servers if servers is not None else get_servers()).facets['modes']
+
+
+def get_all_servers_maps(servers=None):
+    """Return the map of all of the servers, computed once per servers list."""
+    return (servers if servers is not None else get_servers()).facets['maps']
+
+
 def filter_servers(**filters):
     """Filter servers corresponding to the given criteria."""
-    def _filter_server(server, filters):
-        location = filters.get('location', 'any')
-        map = filters.get('map', 'any')
-        type = filters.get('type', 'any')
-        mode = filters.get('mode', 'any')
-        dedicated = filters.get('dedicated')
-        official = filters.get('official')
-        ranked = filters.get('ranked')
-        not_empty = filters.get('not_empty')
-        not_full = filters.get('not_full')
-        database = filters.get('database')
-        username = filters.get('username')
+    return get_servers().filter(filters)
+
+
+def get_counters(servers=None):
+    """Get the number of players online, the active servers as well as the total number of online servers, computed
+    once per servers list."""
+    return (servers if servers is not None else get_servers()).counters
+
+
+@caching.single_flight_memoized
+@cache.memoize(timeout=app.config['PLAYERS_CACHE_TIMEOUT'])
+def _get_players_rows_block(database, sort, block):
+    """Get and parse the given block of PLAYERS_BLOCK_SIZE rows of a RWR players list."""
+    params = {
+        'db': database,
+        'sort': sort,
+        'start': block * PLAYERS_BLOCK_SIZE,
+        'size': PLAYERS_BLOCK_SIZE
+    }
+
+    return list(_iter_html_rows(
+        players_base_url + 'view_players.php',
+        params=params
+    ))
+
+
+@caching.single_flight_memoized
+@cache.memoize(timeout=app.config['PLAYERS_CACHE_TIMEOUT'])
+def _get_players_rows_around_target(database, sort, target, start, limit):
+    """Get and parse the rows of a RWR players list surrounding the given player."""
+    params = {
+        'db': database,
+        'sort': sort,
+        'start': start,
+        'size': limit,
+        'search': target
+    }
 
-        if database and database != server.database:
-            return False
+    return list(_iter_html_rows(
+        players_base_url + 'view_players.php',
+        params=params
+    ))
 
-        if username and username not in server.players.list:
-            return False
 
-        if location != 'any':
-            location_list = location.split('+')
-            location_list_matches = []
+def _get_players_rows(database, sort, start, limit):
+    """Return the rows of a RWR players list in the given window, sliced from the cached blocks covering it."""
+    rows = []
 
-            for location_in_list in location_list:
-                if ':' in location_in_list:
-                    location_type, location_code = location_in_list.split(':', maxsplit=1)
-                else:
-                    location_type = 'country'
-                    location_code = location_in_list
+    for block in range(start // PLAYERS_BLOCK_SIZE, (start + limit - 1) // PLAYERS_BLOCK_SIZE + 1):
+        block_rows = _get_players_rows_block(database, sort, block)
 
-                if location_type == 'continent':
-                    location_list_matches.append(location_code == server.location.continent_code)
-                elif location_type == 'country':
-                    location_list_matches.append(location_code == server.location.country_code)
+        rows.extend(block_rows)
 
-            if True not in location_list_matches:
-                return False
+        if len(block_rows) < PLAYERS_BLOCK_SIZE: # End of the list
+            break
 
-        if map != 'any' and map != server.map.id:
-            return False
+    offset = start % PLAYERS_BLOCK_SIZE
 
-        if type != 'any':
-            type_list = type.split('+')
-            type_list_matches = []
+    return rows[offset:offset + limit]
 
-            for type_in_list in type_list:
-                if type_in_list.startswith('vanilla'):
-                    type_list_matches.append(server.type.startswith('vanilla'))
-                else:
-                    type_list_matches.append(type_in_list == server.type)
 
-            if True not in type_list_matches:
-                return False
+def _refresh_players_block(database, sort, block):
+    """Get and parse the given block of rows of a RWR players list, then replace the cached copy of this block for
+    PLAYERS_MIRROR_CACHE_TIMEOUT seconds, so it is served locally until the next refresh."""
+    with app.app_context():
+        rows = _get_players_rows_block.uncached(database, sort, block)
+        key = _get_players_rows_block.make_cache_key(_get_players_rows_block.uncached, database, sort, block)
 
-        if mode != 'any' and mode != server.mode:
-            return False
+        caching.store(key, rows, app.config['PLAYERS_MIRROR_CACHE_TIMEOUT'])
 
-        if dedicated == 'yes' and not server.is_dedicated:
-            return False
+    return rows
 
-        if official == 'yes' and not server.is_official:
-            return False
 
-        if ranked == 'yes' and not server.is_ranked:
-            return False
+def _remember_requested_players_sort(database, sort):
+    """Record that the given ordering of a RWR players list was requested, so its first rows are kept refreshed."""
+    key = PLAYERS_REQUESTED_SORT_CACHE_KEY.format(database, sort)
 
-        if not_empty == 'yes' and server.players.current == 0:
-            return False
+    if not cache.has(key): # Written at most once per PLAYERS_REQUESTED_SORTS_TIMEOUT seconds, not on every request
+        cache.set(key, True, timeout=app.config['PLAYERS_REQUESTED_SORTS_TIMEOUT'])
 
-        if not_full == 'yes' and server.players.free == 0:
-            return False
 
-        return True
+def get_requested_players_sorts(database):
+    """Return the orderings of the given RWR players list requested in the last PLAYERS_REQUESTED_SORTS_TIMEOUT seconds,
+    the default one always included."""
+    return [
+        sort for sort in constants.VALID_PLAYERS_SORTS
+        if sort == constants.PlayersSort.SCORE.value or cache.has(PLAYERS_REQUESTED_SORT_CACHE_KEY.format(database, sort))
+    ]
 
-    servers = [server for server in get_servers() if _filter_server(server, filters)]
 
-    limit = filters.get('limit')
+def iter_refreshed_players_blocks(databases, sort, count, concurrency=1):
+    """Refresh the first rows of the given RWR players lists by blocks, yielding a (database, start, rows) tuple per block.
 
-    if limit:
-        return servers[:limit]
+    Blocks are requested ahead of time by a pool of threads (at most concurrency of them are pending at once) while the
+    caller handles the previous ones, but are yielded in order. The first incomplete block of a list ends it."""
+    for database in databases:
+        if database not in constants.VALID_DATABASES:
+            raise ValueError('database is invalid')
 
-    return servers
+    concurrency = max(concurrency, 1)
+    blocks_count = (count + PLAYERS_BLOCK_SIZE - 1) // PLAYERS_BLOCK_SIZE
+    next_blocks = deque((database, block) for database in databases for block in range(blocks_count))
+    ended_databases = set()
 
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending_blocks = deque()
 
-def get_counters():
-    """Get the number of players online, the active servers as well as the total number of online servers."""
-    servers = get_servers()
+        def submit_next_block():
+            while next_blocks:
+                database, block = next_blocks.popleft()
 
-    online_players = sum([server.players.current for server in servers])
-    active_servers = sum([1 for server in servers if server.players.current > 0])
-    total_servers = len(servers)
+                if database not in ended_databases:
+                    pending_blocks.append((database, block, executor.submit(_refresh_players_block, database, sort, block)))
 
-    return (online_players, active_servers, total_servers)
+                    return
+
+        for _ in range(concurrency):
+            submit_next_block()
+
+        try:
+            while pending_blocks:
+                database, block, pending_block = pending_blocks.popleft()
+
+                rows = pending_block.result()
+
+                if database in ended_databases: # Requested before the end of its list was known
+                    submit_next_block()
+
+                    continue
+
+                if len(rows) < PLAYERS_BLOCK_SIZE: # End of the list
+                    ended_databases.add(database)
+
+                submit_next_block()
+
+                if rows:
+                    yield database, block * PLAYERS_BLOCK_SIZE, rows
+        finally:
+            for _, _, pending_block in pending_blocks:
+                pending_block.cancel()
+
+
+def refresh_players(database, sort, count, concurrency=1):
+    """Refresh the first rows of the given RWR players list, returning the number of rows refreshed."""
+    return sum(len(rows) for _, _, rows in iter_refreshed_players_blocks([database], sort, count, concurrency))
 
 
-@cache.memoize(timeout=app.config['PLAYERS_CACHE_TIMEOUT'])
 def get_players(database, sort=constants.PlayersSort.SCORE.value, target=None, start=0, limit=app.config['LIST_PAGE_SIZES'][0]):
     """Get and parse a list of RWR players."""
     if limit > 100:
@@ -426,21 +634,15 @@ def get_players(database, sort=constants.PlayersSort.SCORE.value, target=None, s
     if database not in constants.VALID_DATABASES:
         raise ValueError('database is invalid')
 
-    params = {
-        'db': database,
-        'sort': sort,
-        'start': start,
-        'size': limit,
-        'search': target
-    }
+    if target:
+        rows = _get_players_rows_around_target(database, sort, target, start, limit)
+    else:
+        if start < app.config['PLAYERS_MIRROR_SIZE']:
+            _remember_requested_players_sort(database, sort)
 
-    html_content = _call(
-        players_base_url + 'view_players.php',
-        parser='html',
-        params=params
-    )
+        rows = _get_players_rows(database, sort, start, limit)
 
-    players = [Player.load(database, node) for node in html_content.xpath('//table/tr[position() > 1]')]
+    players = [Player.load(database, row) for row in rows]
 
     if target and target not in [player.username for player in players]:
         return []
@@ -514,6 +716,7 @@ def clear_credentials(realm, hash):
     return dict(xml_content.attrib)
 
 
+@caching.single_flight_memoized
 @cache.memoize(timeout=app.config['PLAYERS_CACHE_TIMEOUT'])
 def search_player_by_username(database, username, check_exist_only=False):
     """Search for a RWR player (exact match)."""
@@ -527,40 +730,22 @@ def search_player_by_username(database, username, check_exist_only=False):
         'search': username
     }
 
-    html_content = _call(
+    rows = list(_iter_html_rows(
         players_base_url + 'view_player.php',
-        parser='html',
         params=params
-    )
-
-    node = html_content.xpath('(//table/tr[position() = 2])[1]')
+    ))
 
     if check_exist_only:
-        return False if not node else True
+        return False if not rows else True
     else:
-        if not node:
+        if not rows:
             return None
 
-        return Player.load(database, node[0], alternative=True)
+        return Player.load(database, rows[0], alternative=True)
 
 
 def get_current_server_of_player(target_username):
     """Return the server where the specified player is playing on, if any (partial match)."""
-    servers = get_servers()
-
-    target_username = target_username.lower()
-    real_username = target_username
-    found_server = None
-
-    for server in servers:
-        if not server.players.list:
-            continue
-
-        players_list = [player.lower() for player in server.players.list]
-
-        for player in players_list:
-            if target_username in player:
-                real_username = player
-                found_server = server
+    real_username, found_server = get_servers().search_by_player(target_username)
 
-    return real_username.upper(), found_server
+    return (real_username or target_username.lower()).upper(), found_server
@@ -1,16 +1,212 @@
 from sqlalchemy.util import memoized_property
-from flask import url_for, current_app
 from rwr import constants, utils
+from bisect import bisect_right
 from slugify import slugify
 from app import app
+import sys
+
+EMPTY_LOCATION_RECORD = (None, None, None, None, None, None)
+
+
+def _intern(string):
+    """Intern the given string (if any) so that values repeated across servers are only stored and pickled once."""
+    return sys.intern(string) if string is not None else None
+
+
+def _type_facet(type):
+    """Return the value under which the given server type is indexed, all vanilla types being considered the same."""
+    return 'vanilla' if type.startswith('vanilla') else type
+
+
+def _build_search_index(entries):
+    """Build a partial matching index from (string, position) entries: the lowercased strings joined by NUL characters,
+    the offset each of them starts at and their positions."""
+    strings = []
+    offsets = []
+    positions = []
+    offset = 0
+
+    for string, position in entries:
+        string = string.lower()
+
+        strings.append(string)
+        offsets.append(offset)
+        positions.append(position)
+
+        offset += len(string) + 1
+
+    return '\0'.join(strings), tuple(offsets), tuple(positions)
+
+
+def _search_index(index, needle, last=False):
+    """Return the lowercased string and position of the first (or last) entry of the given index containing the given
+    string (case-insensitive), if any."""
+    joined, offsets, positions = index
+    needle = needle.lower()
+
+    if not offsets or '\0' in needle:
+        return None, None
+
+    found = joined.rfind(needle) if last else joined.find(needle)
+
+    if found < 0:
+        return None, None
+
+    i = bisect_right(offsets, found) - 1
+    end = offsets[i + 1] - 1 if i + 1 < len(offsets) else len(joined)
+
+    return joined[offsets[i]:end], positions[i]
+
+
+class ServerList(list):
+    """A list of servers, along with lookup indexes built once when it is scraped and pickled along with it."""
+    def build_indexes(self):
+        """(Re)build the lookup indexes of this list, which must be called once it's sorted."""
+        self.by_ip_and_port = {}
+        self.by_player = {}
+        self.by_facet = {}
+
+        for position, server in enumerate(self):
+            # First match wins, as when the list was walked
+            self.by_ip_and_port.setdefault((server.ip, server.port), position)
+
+            for username in server.players.list:
+                self.by_player.setdefault(username, position)
+
+            for facet in (
+                ('database', server.database),
+                ('continent', server.location.continent_code),
+                ('country', server.location.country_code),
+                ('map', server.map.id),
+                ('type', _type_facet(server.type)),
+                ('mode', server.mode),
+            ):
+                self.by_facet.setdefault(facet, set()).add(position)
+
+        # Searched as one string each, which is cheap to unpickle and scanned by str.find()
+        self.names_index = _build_search_index((server.name, position) for position, server in enumerate(self))
+        self.usernames_index = _build_search_index(
+            (username, position) for position, server in enumerate(self) for username in server.players.list
+        )
+
+    def get_by_ip_and_port(self, ip, port):
+        """Return the server with the given IP and port, if any."""
+        position = self.by_ip_and_port.get((ip, port))
+
+        return self[position] if position is not None else None
+
+    def get_by_player(self, username):
+        """Return the server the given player (exact username) is playing on, if any."""
+        position = self.by_player.get(username)
+
+        return self[position] if position is not None else None
+
+    @staticmethod
+    def _compile_filters(filters):
+        """Compile the given filters into a list of facets groups (a server must be indexed under at least one facet of
+        each group) and a list of checks to be run against the remaining servers."""
+        location = filters.get('location', 'any')
+        map = filters.get('map', 'any')
+        type = filters.get('type', 'any')
+        mode = filters.get('mode', 'any')
+        database = filters.get('database')
+        username = filters.get('username')
+
+        groups = []
+        checks = []
+
+        if database:
+            groups.append({('database', database)})
+
+        if location != 'any':
+            location_facets = set()
+
+            for location_in_list in location.split('+'):
+                if ':' in location_in_list:
+                    location_type, location_code = location_in_list.split(':', maxsplit=1)
+                else:
+                    location_type = 'country'
+                    location_code = location_in_list
+
+                if location_type in ('continent', 'country'):
+                    location_facets.add((location_type, location_code))
+
+            groups.append(location_facets)
+
+        if map != 'any':
+            groups.append({('map', map)})
+
+        if type != 'any':
+            groups.append({('type', _type_facet(type_in_list)) for type_in_list in type.split('+')})
+
+        if mode != 'any':
+            groups.append({('mode', mode)})
+
+        if username:
+            checks.append(lambda server: username in server.players.list)
+
+        if filters.get('dedicated') == 'yes':
+            checks.append(lambda server: server.is_dedicated)
+
+        if filters.get('official') == 'yes':
+            checks.append(lambda server: server.is_official)
+
+        if filters.get('ranked') == 'yes':
+            checks.append(lambda server: server.is_ranked)
+
+        if filters.get('not_empty') == 'yes':
+            checks.append(lambda server: server.players.current != 0)
+
+        if filters.get('not_full') == 'yes':
+            checks.append(lambda server: server.players.free != 0)
+
+        return groups, checks
+
+    def filter(self, filters):
+        """Return the servers (in order) corresponding to the given criteria."""
+        groups, checks = self._compile_filters(filters)
+
+        positions = None
+
+        for group in groups:
+            matching = set().union(*[self.by_facet.get(facet, ()) for facet in group])
+            positions = matching if positions is None else positions & matching
+
+            if not positions:
+                return []
+
+        servers = self if positions is None else [self[position] for position in sorted(positions)]
+
+        if checks:
+            servers = [server for server in servers if all(check(server) for check in checks)]
+        else:
+            servers = list(servers)
+
+        limit = filters.get('limit')
+
+        if limit:
+            return servers[:limit]
+
+        return servers
+
+    def search_by_name(self, name):
+        """Return the first server whose name contains the given string (case-insensitive), if any."""
+        _, position = _search_index(self.names_index, name)
+
+        return self[position] if position is not None else None
+
+    def search_by_player(self, username):
+        """Return the lowercased username and server of the last player whose username contains the given string
+        (case-insensitive), if any."""
+        real_username, position = _search_index(self.usernames_index, username, last=True)
+
+        return real_username, self[position] if position is not None else None
 
 
 class Server:
     @classmethod
     def load(cls, server_node):
         """Load a server data from an XML node from the servers list page."""
-        ret = cls()
-
         name_node = server_node.find('name')
         address_node = server_node.find('address')
         port_node = server_node.find('port')
@@ -25,16 +221,63 @@ class Server:
         mode_node = server_node.find('mode')
         realm_node = server_node.find('realm')
 
-        ret.name = name_node.text.strip() if name_node.text else 'N/A'
-        ret.ip = address_node.text
-        ret.port = int(port_node.text)
-
         server_type, map_id = utils.parse_map_path(map_id_node.text.replace('//', '/'))
 
-        ret.type = server_type
+        current_players = int(current_players_node.text)
+
+        players = [player_node.text for player_node in server_node.findall('player') if player_node.text]
+        players.sort()
+
+        return cls.from_record((
+            name_node.text.strip() if name_node.text else 'N/A',
+            address_node.text,
+            int(port_node.text),
+            _intern(server_type),
+            _intern(map_id),
+            int(bots_node.text),
+            0 if current_players < 0 else current_players,
+            int(max_players_node.text),
+            tuple(players),
+            _intern(version_node.text),
+            True if dedicated_node.text == '1' else False,
+            comment_node.text.strip() if comment_node.text else None,
+            url_node.text.strip() if url_node.text else None,
+            _intern(mode_node.text),
+            _intern(realm_node.text),
+            server_node.get('last') is not None,
+            EMPTY_LOCATION_RECORD,
+            None
+        ))
+
+    @classmethod
+    def from_record(cls, record):
+        """Create a server from the compact tuple representation returned by to_record()."""
+        ret = cls()
+
+        (
+            ret.name,
+            ret.ip,
+            ret.port,
+            ret.type,
+            map_id,
+            ret.bots,
+            current_players,
+            max_players,
+            players,
+            ret.version,
+            ret.is_dedicated,
+            ret.comment,
+            ret.website,
+            ret.mode,
+            ret.realm,
+            ret.is_last,
+            location,
+            ret.event
+        ) = record
 
         ret.map = ServerMap()
         ret.map.id = map_id
+        ret.map.game_type = ret.type
 
         if ret.type in constants.MAPS and ret.map.id in constants.MAPS[ret.type]:
             target_map = constants.MAPS[ret.type][ret.map.id]
@@ -43,52 +286,60 @@ class Server:
             ret.map.has_minimap = target_map['has_minimap']
             ret.map.has_preview = target_map['has_preview']
 
-            if ret.map.has_preview:
-                if current_app:
-                    ret.map.set_preview_image_urls(ret.type)
-                else:
-                    with app.app_context():
-                        ret.map.set_preview_image_urls(ret.type)
-
-            if ret.map.has_minimap:
-                if current_app:
-                    ret.map.set_minimap_image_urls(ret.type)
-                else:
-                    with app.app_context():
-                        ret.map.set_minimap_image_urls(ret.type)
-
         ret.map.name_display = ret.map.name if ret.map.name else ret.map.id
 
-        ret.bots = int(bots_node.text)
-
         ret.players = ServerPlayers()
-        ret.players.current = 0 if int(current_players_node.text) < 0 else int(current_players_node.text)
-        ret.players.max = int(max_players_node.text)
+        ret.players.current = current_players
+        ret.players.max = max_players
         ret.players.free = ret.players.max - ret.players.current
-
-        ret.version = version_node.text
-        ret.is_dedicated = True if dedicated_node.text == '1' else False
-        ret.comment = comment_node.text.strip() if comment_node.text else None
-        ret.website = url_node.text.strip() if url_node.text else None
-        ret.mode = mode_node.text
-        ret.realm = realm_node.text
+        ret.players.list = list(players)
 
         ret.location = ServerLocation()
 
-        ret.players.list = [player_node.text for player_node in server_node.findall('player') if player_node.text]
-        ret.players.list.sort()
+        (
+            ret.location.continent_code,
+            ret.location.continent_name,
+            ret.location.country_code,
+            ret.location.country_name,
+            ret.location.city_name,
+            ret.location.text
+        ) = location
 
-        ret.is_last = server_node.get('last') is not None
+        return ret
 
-        if current_app:
-            ret.set_links()
-            ret.set_images()
-        else:
-            with app.app_context():
-                ret.set_links()
-                ret.set_images()
+    def to_record(self):
+        """Return the compact tuple representation of this server, made of the scraped values only."""
+        return (
+            self.name,
+            self.ip,
+            self.port,
+            self.type,
+            self.map.id,
+            self.bots,
+            self.players.current,
+            self.players.max,
+            tuple(self.players.list),
+            self.version,
+            self.is_dedicated,
+            self.comment,
+            self.website,
+            self.mode,
+            self.realm,
+            self.is_last,
+            (
+                self.location.continent_code,
+                self.location.continent_name,
+                self.location.country_code,
+                self.location.country_name,
+                self.location.city_name,
+                self.location.text
+            ),
+            getattr(self, 'event', None)
+        )
 
-        return ret
+    def __reduce__(self):
+        """Only pickle the compact tuple representation of this server, everything else being rebuilt when unpickled."""
+        return Server.from_record, (self.to_record(),)
 
     @memoized_property
     def name_slug(self):
@@ -143,32 +394,31 @@ class Server:
             port=self.port
         )
 
-    def set_links(self):
-        """Set the relative and absolute URLs of this server's details page."""
-        params = {
-            'ip': self.ip,
-            'port': self.port,
-            'slug': self.name_slug
-        }
+    @memoized_property
+    def link(self):
+        """Relative URL of this server's details page."""
+        return utils.build_url('server_details', ip=self.ip, port=self.port, slug=self.name_slug)
 
-        self.link = url_for('server_details', **params)
-        self.link_absolute = url_for('server_details', **params, _external=True)
+    @memoized_property
+    def link_absolute(self):
+        """Absolute URL of this server's details page."""
+        return utils.build_url('server_details', ip=self.ip, port=self.port, slug=self.name_slug, _external=True)
 
-    def set_images(self):
-        """Set the relative and absolute URLs to the images of this Server."""
+    @memoized_property
+    def banner(self):
+        """Relative URL to the banner image of this server, if dedicated."""
         if not self.is_dedicated:
-            self.banner = None
-            self.banner_absolute = None
+            return None
 
-            return
+        return utils.build_url('dynamic_server_image', ip=self.ip, port=self.port)
 
-        params = {
-            'ip': self.ip,
-            'port': self.port
-        }
+    @memoized_property
+    def banner_absolute(self):
+        """Absolute URL to the banner image of this server, if dedicated."""
+        if not self.is_dedicated:
+            return None
 
-        self.banner = url_for('dynamic_server_image', **params)
-        self.banner_absolute = url_for('dynamic_server_image', **params, _external=True)
+        return utils.build_url('dynamic_server_image', ip=self.ip, port=self.port, _external=True)
 
     @memoized_property
     def database(self):
@@ -198,6 +448,7 @@ class Server:
 
 class ServerMap:
     def __init__(self):
+        self.game_type = None
         self.name = None
         self.has_minimap = False
         self.has_preview = False
@@ -205,29 +456,35 @@ class ServerMap:
     def __repr__(self):
         return 'ServerMap:' + self.id
 
-    def set_preview_image_urls(self, game_type):
-        """Set the relative and absolute URLs to the preview image of this map."""
-        params = {
-            'game_type': game_type,
-            'map_id': self.id
-        }
+    def _get_image_url(self, kind, external=False):
+        """Return the URL to the preview or minimap image of this map."""
+        image_url = 'images/maps/{kind}/{game_type}/{map_id}.png'.format(
+            kind=kind,
+            game_type=self.game_type,
+            map_id=self.id
+        )
 
-        preview_url = 'images/maps/preview/{game_type}/{map_id}.png'.format(**params)
+        return utils.build_url('static', filename=image_url, _external=external)
 
-        self.preview = url_for('static', filename=preview_url)
-        self.preview_absolute = url_for('static', filename=preview_url, _external=True)
+    @memoized_property
+    def preview(self):
+        """Relative URL to the preview image of this map, if any."""
+        return self._get_image_url('preview') if self.has_preview else None
 
-    def set_minimap_image_urls(self, game_type):
-        """Set the relative and absolute URLs to the minimap image of this map."""
-        params = {
-            'game_type': game_type,
-            'map_id': self.id
-        }
+    @memoized_property
+    def preview_absolute(self):
+        """Absolute URL to the preview image of this map, if any."""
+        return self._get_image_url('preview', external=True) if self.has_preview else None
 
-        minimap_url = 'images/maps/minimap/{game_type}/{map_id}.png'.format(**params)
+    @memoized_property
+    def minimap(self):
+        """Relative URL to the minimap image of this map, if any."""
+        return self._get_image_url('minimap') if self.has_minimap else None
 
-        self.minimap = url_for('static', filename=minimap_url)
-        self.minimap_absolute = url_for('static', filename=minimap_url, _external=True)
+    @memoized_property
+    def minimap_absolute(self):
+        """Absolute URL to the minimap image of this map, if any."""
+        return self._get_image_url('minimap', external=True) if self.has_minimap else None
 
 
 class ServerPlayers:
@@ -247,18 +504,24 @@ class ServerLocation:
         self.continent_name = None
         self.text = None
 
-    def set_flags(self):
+    def _get_flag_url(self, external=False):
+        """Return the URL to the flag image of this location's country."""
         if not self.country_code:
-            return
+            return None
 
-        params = {
-            'country_code': self.country_code.upper(),
-        }
+        flag_url = 'images/flags/{country_code}.png'.format(
+            country_code=self.country_code.upper()
+        )
 
-        flag_url = 'images/flags/{country_code}.png'.format(**params)
+        return utils.build_url('static', filename=flag_url, _external=external)
 
-        self.flag = url_for('static', filename=flag_url)
-        self.flag_absolute = url_for('static', filename=flag_url, _external=True)
+    @memoized_property
+    def flag(self):
+        return self._get_flag_url()
+
+    @memoized_property
+    def flag_absolute(self):
+        return self._get_flag_url(external=True)
 
     def __repr__(self):
         return 'ServerLocation:' + self.country_code
@@ -1,7 +1,9 @@
 from rwr.player import PlayerRank
-from flask import current_app
+from flask import current_app, url_for
+from bisect import bisect_right
 from rwr import constants
 from app import app
+import numpy
 import re
 
 
@@ -58,35 +60,64 @@ def parse_map_path(map_path):
     return server_type, map_id
 
 
-def get_rank_from_xp(database, xp):
-    current_rank_id = 0
+def build_url(endpoint, **values):
+    """Build a URL to the given endpoint, pushing an application context if there isn't one."""
+    if current_app:
+        return url_for(endpoint, **values)
 
-    for rank_id, rank in constants.RANKS[database].items():
-        if rank['xp'] > xp:
-            break
+    with app.app_context():
+        return url_for(endpoint, **values)
 
-        current_rank_id = rank_id
 
-    return get_rank_object(database, int(current_rank_id))
+def _build_ranks_lookup(ranks):
+    """Build the rank lookup structures of a database: the XP thresholds (ascending) along the corresponding rank IDs,
+    as lists and NumPy arrays, and the PlayerRank instance of every rank ID."""
+    xp_thresholds = [rank['xp'] for rank in ranks.values()]
+    rank_ids = [int(rank_id) for rank_id in ranks.keys()]
+    rank_objects = {}
 
+    for rank_id, rank in ranks.items():
+        rank_object = PlayerRank()
+        rank_object.id = int(rank_id)
+        rank_object.name = rank['name']
+        rank_object.xp = rank['xp']
 
-def get_rank_object(database, rank_id):
-    """Return a new PlayerRank object given a rank ID."""
-    ret = PlayerRank()
+        rank_objects[rank_id] = rank_object
 
-    ranks = constants.RANKS[database]
+    return xp_thresholds, rank_ids, numpy.array(xp_thresholds), numpy.array(rank_ids), rank_objects
 
-    if str(rank_id) not in ranks:
-        return ret
 
-    ret.id = rank_id
-    ret.name = ranks[str(rank_id)]['name']
-    ret.xp = ranks[str(rank_id)]['xp']
+_ranks_lookup = {database: _build_ranks_lookup(ranks) for database, ranks in constants.RANKS.items()}
 
-    if current_app:
-        ret.set_images_and_icons()
-    else:
-        with app.app_context():
-            ret.set_images_and_icons()
 
-    return ret
+def get_rank_id_from_xp(database, xp):
+    """Return the ID of the rank corresponding to the given amount of XP."""
+    xp_thresholds, rank_ids, _, _, _ = _ranks_lookup[database]
+
+    index = bisect_right(xp_thresholds, xp) - 1
+
+    return rank_ids[index] if index >= 0 else 0
+
+
+def get_rank_ids_from_xp(database, xp):
+    """Return the IDs of the ranks corresponding to the given amounts of XP (array-like) as a NumPy array."""
+    _, _, xp_thresholds, rank_ids, _ = _ranks_lookup[database]
+
+    indexes = numpy.searchsorted(xp_thresholds, xp, side='right') - 1
+
+    return numpy.where(indexes >= 0, rank_ids[numpy.maximum(indexes, 0)], 0)
+
+
+def get_rank_from_xp(database, xp):
+    """Return the PlayerRank object corresponding to the given amount of XP."""
+    return get_rank_object(database, get_rank_id_from_xp(database, xp))
+
+
+def get_rank_object(database, rank_id):
+    """Return the PlayerRank object given a rank ID. Known ranks are shared and must not be modified."""
+    rank_object = _ranks_lookup[database][4].get(str(rank_id))
+
+    if not rank_object:
+        return PlayerRank()
+
+    return rank_object
@@ -155,10 +155,9 @@ class PlayerStatsHistoryResource(BaseResource):
         if not player.rwr_account:
             abort(412, message='Stats history unavailable for this player')
 
-        return player.rwr_account.ordered_stats.paginate(
+        return player.rwr_account.paginate_stats(
             page=args['page'],
-            per_page=args['limit'],
-            error_out=False
+            per_page=args['limit']
         ).items
 
 
@@ -42,48 +42,139 @@ def update_discord_commands():
 
 
 @app.cli.command()
-@click.option('--starting-id', type=int, default=0)
-@click.option('--limit', type=int, default=200)
-def recompute_hashes(starting_id, limit):
+@click.option('--starting-id', type=int, default=0, help='Only recompute hashes of stats having an ID greater than this one')
+@click.option('--limit', type=int, default=10000, help='Number of stats processed at once')
+@click.option('--processes', type=int, help='Number of processes computing hashes (defaults to the number of CPUs)')
+def recompute_hashes(starting_id, limit, processes):
     """Recompute all stats history hashes."""
-    from rwrs.models import RwrAccountStat
+    from rwrs.models import RwrAccountStat, compute_stats_hash
+    from concurrent.futures import ProcessPoolExecutor
     from sqlalchemy import func
     from app import db
+    import time
+    import os
 
     click.echo('Recomputing all stats history hashes...')
 
+    processes = processes or os.cpu_count() or 1
+    columns = [getattr(RwrAccountStat, column) for column in RwrAccountStat.HASHED_COLUMNS]
+
     current_id = starting_id
-    total = RwrAccountStat.query.with_entities(func.count('*')).filter(RwrAccountStat.id > current_id).order_by(RwrAccountStat.id.asc()).scalar()
+    total = RwrAccountStat.query.with_entities(func.count('*')).filter(RwrAccountStat.id > current_id).scalar()
     processed = 0
+    updated = 0
+    started_at = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        while True:
+            rows = db.session.query(RwrAccountStat.id, RwrAccountStat.hash, *columns).filter(
+                RwrAccountStat.id > current_id
+            ).order_by(RwrAccountStat.id.asc()).limit(limit).all()
+
+            if not rows:
+                click.echo('Reached end of the list')
+
+                break
+
+            hashes = executor.map(
+                compute_stats_hash,
+                [tuple(row[2:]) for row in rows],
+                chunksize=max(1, len(rows) // processes)
+            )
+
+            mappings = [{'id': row[0], 'hash': hash} for row, hash in zip(rows, hashes) if hash != row[1]]
+
+            if mappings:
+                db.session.bulk_update_mappings(RwrAccountStat, mappings)
+                db.session.commit()
+
+            current_id = rows[-1][0]
+            processed += len(rows)
+            updated += len(mappings)
+            elapsed = time.perf_counter() - started_at
+
+            click.echo('#{} ({} / {} - {:.2%}, {} updated, {:.0f} rows/s)'.format(
+                current_id,
+                processed,
+                total,
+                processed / total if total else 1,
+                updated,
+                processed / elapsed if elapsed else 0
+            ))
+
+    click.echo('{} stats processed, {} updated in {:.2f}s'.format(processed, updated, time.perf_counter() - started_at))
+
+    click.secho('Done', fg='green')
+
+
+@app.cli.command()
+@click.option('--loop', is_flag=True, help='Keep refreshing the servers list until interrupted')
+@click.option('--interval', type=int, help='Number of seconds between two refreshes (defaults to SERVERS_REFRESH_INTERVAL)')
+@check_maintenance
+def refresh_servers(loop, interval):
+    """Refresh the cached servers list."""
+    from app import db
+    import rwr.scraper
+    import time
+
+    if not interval:
+        interval = app.config['SERVERS_REFRESH_INTERVAL']
 
     while True:
-        if processed >= total:
-            click.echo('Reached end of the list')
+        click.echo('Refreshing servers list')
 
+        try:
+            servers = rwr.scraper.refresh_servers()
+
+            click.echo('  {} servers'.format(len(servers)))
+        except Exception as e:
+            if not loop:
+                raise
+
+            click.secho(str(e), fg='red')
+
+        if not loop:
             break
 
-        percentage = ((processed * 100) / total) / 100
+        db.session.remove() # Do not keep a transaction open between two refreshes so changes (e.g. events) are seen
 
-        click.echo(f'#{current_id} ({total} / {percentage:.2%})')
+        time.sleep(interval)
 
-        rwr_account_stats = RwrAccountStat.query.filter(RwrAccountStat.id > current_id).order_by(RwrAccountStat.id.asc()).limit(limit).all()
+    click.secho('Done', fg='green')
 
-        if not rwr_account_stats:
-            click.echo('No more stats to process')
 
-            break
+@app.cli.command()
+@click.option('--loop', is_flag=True, help='Keep refreshing the players lists until interrupted')
+@click.option('--interval', type=int, help='Number of seconds between two refreshes (defaults to PLAYERS_REFRESH_INTERVAL)')
+@check_maintenance
+def refresh_players(loop, interval):
+    """Refresh the cached first PLAYERS_MIRROR_SIZE rows of every recently requested players list ordering."""
+    import rwr.constants
+    import rwr.scraper
+    import time
 
-        for rwr_account_stat in rwr_account_stats:
-            rwr_account_stat.compute_hash()
+    if not interval:
+        interval = app.config['PLAYERS_REFRESH_INTERVAL']
 
-        db.session.bulk_save_objects(rwr_account_stats)
-        db.session.commit()
+    while True:
+        for database in rwr.constants.VALID_DATABASES:
+            for players_sort in rwr.scraper.get_requested_players_sorts(database):
+                click.echo('Refreshing {} players list ordered by {}'.format(database, players_sort))
+
+                try:
+                    rows_count = rwr.scraper.refresh_players(database, players_sort, app.config['PLAYERS_MIRROR_SIZE'], app.config['PLAYERS_FETCH_CONCURRENCY'])
 
-        current_id = rwr_account_stats[-1].id
+                    click.echo('  {} players'.format(rows_count))
+                except Exception as e:
+                    if not loop:
+                        raise
 
-        del rwr_account_stats
+                    click.secho(str(e), fg='red')
 
-        processed += limit
+        if not loop:
+            break
+
+        time.sleep(interval)
 
     click.secho('Done', fg='green')
 
@@ -92,7 +183,7 @@ def recompute_hashes(starting_id, limit):
 @check_maintenance
 def get_players_count():
     """Store the number of players."""
-    from rwrs.models import ServerPlayerCount, SteamPlayerCount, Variable
+    from rwrs.models import ServerPlayerCount, ServerPlayerCountRollup, SteamPlayerCount, Variable
     from rwrs import steam_helpers
     from app import cache, db
     import rwr.scraper
@@ -100,7 +191,6 @@ def get_players_count():
 
     click.echo('Clearing cache')
 
-    cache.delete_memoized(rwr.scraper.get_servers)
     cache.delete_memoized(ServerPlayerCount.server_players_data)
     cache.delete_memoized(ServerPlayerCount.servers_data)
     cache.delete_memoized(steam_helpers.get_current_players_count_for_app)
@@ -118,7 +208,10 @@ def get_players_count():
 
     click.echo('Getting current players on servers')
 
-    servers = rwr.scraper.get_servers()
+    servers = rwr.scraper.refresh_servers()
+
+    measured_at = arrow.utcnow().floor('minute')
+    servers_count = {}
 
     current_online_players_count = 0
     current_online_servers_count = 0
@@ -128,10 +221,13 @@ def get_players_count():
         click.echo('  {} ({}, {})'.format(server.name, server.players.current, server.ip_and_port))
 
         server_player_count = ServerPlayerCount()
+        server_player_count.measured_at = measured_at
         server_player_count.ip = server.ip
         server_player_count.port = server.port
         server_player_count.count = server.players.current
 
+        servers_count[(server.ip, server.port)] = server.players.current
+
         current_online_players_count += server.players.current
         current_online_servers_count += 1
 
@@ -140,6 +236,10 @@ def get_players_count():
 
         db.session.add(server_player_count)
 
+    click.echo('Updating rollups')
+
+    ServerPlayerCountRollup.add_measures(measured_at, servers_count)
+
     click.echo('Saving peaks')
 
     peak_refs = {
@@ -174,27 +274,152 @@ def get_players_count():
 
 
 @app.cli.command()
+@click.option('--batch-size', type=int, default=10000, help='Number of entries deleted at once')
 @check_maintenance
-def clean_players_count():
+def clean_players_count(batch_size):
     """Delete old players count."""
-    from rwrs.models import ServerPlayerCount, SteamPlayerCount
+    from rwrs.models import ServerPlayerCount, ServerPlayerCountRollup, SteamPlayerCount
     from app import db
+    import time
 
-    click.echo('Deleting old data')
+    for model in (ServerPlayerCount, SteamPlayerCount):
+        click.echo('Deleting old {} entries'.format(model.__name__))
 
-    old_entries = ServerPlayerCount.query.get_old_entries()
-    old_entries.extend(SteamPlayerCount.query.get_old_entries())
+        started_at = time.perf_counter()
+        deleted_count = 0
 
-    for old_entry in old_entries:
-        db.session.delete(old_entry)
+        for batch in model.get_old_entries_batches(batch_size):
+            deleted_count += batch.delete(synchronize_session=False)
 
-    click.echo('Persisting to database')
+            db.session.commit()
 
+            elapsed = time.perf_counter() - started_at
+
+            click.echo('  {} deleted ({:.0f} rows/s)'.format(deleted_count, deleted_count / elapsed if elapsed else 0))
+
+        click.echo('  {} deleted in {:.2f}s'.format(deleted_count, time.perf_counter() - started_at))
+
+    click.echo('Deleting old rollups')
+
+    ServerPlayerCountRollup.query.get_old_entries_query().delete(synchronize_session=False)
     db.session.commit()
 
     click.secho('Done', fg='green')
 
 
+@app.cli.command()
+@click.option('--batch-size', type=int, default=10000, help='Number of players count processed at once')
+@check_maintenance
+def compute_players_count_rollups(batch_size):
+    """Compute players count rollups from the players count still stored, replacing the existing ones of the ended periods
+    they fully cover."""
+    from rwrs.models import ServerPlayerCount, ServerPlayerCountRollup, period_start
+    from itertools import groupby
+    from sqlalchemy import func
+    from app import db
+    import arrow
+
+    oldest_measured_at = db.session.query(func.min(ServerPlayerCount.measured_at)).scalar()
+
+    if not oldest_measured_at:
+        click.echo('No players count stored')
+
+        return
+
+    started_at = arrow.utcnow()
+
+    # Periods are only recomputed from the first one fully covered by the players count still stored (older rollups can't
+    # be computed again) up to the ongoing one (excluded, as it is still maintained when players count are stored)
+    windows = {}
+
+    for period, _ in ServerPlayerCountRollup.PERIODS:
+        first_period_start = period_start(oldest_measured_at, period)
+
+        if first_period_start < oldest_measured_at:
+            first_period_start = first_period_start.shift(seconds=period)
+
+        windows[period] = (first_period_start, period_start(started_at, period))
+
+    if not click.confirm('This will replace the players count rollups of the periods starting from {}. Proceed?'.format(
+        min(first_period_start for first_period_start, _ in windows.values())
+    )):
+        return
+
+    click.echo('Deleting existing rollups...')
+
+    for period, (first_period_start, end_period_start) in windows.items():
+        ServerPlayerCountRollup.query.filter(
+            ServerPlayerCountRollup.period == period,
+            ServerPlayerCountRollup.period_start >= first_period_start,
+            ServerPlayerCountRollup.period_start < end_period_start
+        ).delete(synchronize_session=False)
+
+    db.session.commit()
+
+    click.echo('Computing rollups...')
+
+    rollups = {}
+    last_measured_at = None
+    saved = 0
+
+    def save_rollups(keys):
+        """Save the rollups of the given keys which are part of the recomputed periods, the same way players count are."""
+        saved_rollups = []
+
+        for key in keys:
+            rollup = rollups.pop(key)
+            first_period_start, end_period_start = windows[rollup.period]
+
+            if first_period_start <= rollup.period_start < end_period_start:
+                saved_rollups.append(rollup)
+
+        ServerPlayerCountRollup.upsert(saved_rollups)
+        db.session.commit()
+
+        return len(saved_rollups)
+
+    while True:
+        query = ServerPlayerCount.query.with_entities(
+            ServerPlayerCount.measured_at,
+            ServerPlayerCount.ip,
+            ServerPlayerCount.port,
+            ServerPlayerCount.count
+        ).filter(ServerPlayerCount.measured_at < started_at)
+
+        if last_measured_at:
+            query = query.filter(ServerPlayerCount.measured_at > last_measured_at)
+
+        measures = query.order_by(ServerPlayerCount.measured_at.asc()).limit(batch_size).all()
+
+        if not measures:
+            break
+
+        # The measures of the last date may be incomplete: leave them to the next batch, or get them all if it's the only one
+        if len(measures) == batch_size:
+            if measures[0][0] != measures[-1][0]:
+                measures = [measure for measure in measures if measure[0] != measures[-1][0]]
+            else:
+                measures = query.filter(ServerPlayerCount.measured_at == measures[0][0]).all()
+
+        for measured_at, rows in groupby(measures, key=lambda row: row[0]):
+            ServerPlayerCountRollup.accumulate(rollups, measured_at, {(ip, port): count for _, ip, port, count in rows})
+
+        last_measured_at = measures[-1][0]
+
+        # Rollups of ended periods won't change anymore
+        saved += save_rollups([
+            key for key, rollup in rollups.items() if rollup.period_start.shift(seconds=rollup.period) <= last_measured_at
+        ])
+
+        click.echo('  {} ({} rollups saved)'.format(last_measured_at, saved))
+
+    click.echo('Saving remaining rollups...')
+
+    save_rollups(list(rollups.keys()))
+
+    click.secho('Done', fg='green')
+
+
 @app.cli.command()
 @click.option('--steamdir', '-g', help='Steam root directory')
 def extract_ranks(steamdir):
@@ -258,123 +483,142 @@ def extract_minimaps(steamdir):
 @app.cli.command()
 @click.option('--reset', is_flag=True, help='Reset all RWR accounts and stats')
 @click.option('--create-accounts-only', is_flag=True, help='Only create RWR accounts if they do not exist')
+@click.option('--concurrency', type=int, help='Number of players lists chunks fetched at once (defaults to PLAYERS_FETCH_CONCURRENCY)')
 @check_maintenance
-def save_players_stats(reset, create_accounts_only):
+def save_players_stats(reset, create_accounts_only, concurrency):
     """Retrieve and persist the players stats."""
-    from rwrs.models import RwrAccount, RwrAccountType, RwrAccountStat, one_year_ago
+    from rwrs.models import RwrAccount, RwrAccountStat, RwrAccountStatArchive, one_year_ago
+    from rwr.player import Player
     from app import db, cache
     import rwr.constants
     import rwr.scraper
     import rwr.utils
-    import arrow
+    import time
 
     if reset and click.confirm('Are you sure to reset all RWR accounts and stats?'):
+        RwrAccountStatArchive.query.delete()
         RwrAccountStat.query.delete()
         RwrAccount.query.delete()
         db.session.commit()
 
+    if not concurrency:
+        concurrency = app.config['PLAYERS_FETCH_CONCURRENCY']
+
     players_sort = rwr.constants.PlayersSort.XP.value
     players_count = app.config['MAX_NUM_OF_PLAYERS_TO_TRACK_STATS_FOR']
-    chunks = 100
 
-    cache.delete_memoized(rwr.scraper.get_players)
+    click.echo('Saving the first {} players stats of each database (ordered by {}, {} fetches at once)'.format(
+        players_count,
+        players_sort,
+        concurrency
+    ))
 
-    for database in rwr.constants.VALID_DATABASES:
-        rwr_account_type = RwrAccountType(database.upper())
+    timings = {database: dict.fromkeys(('fetch', 'accounts', 'latest stats', 'stats'), 0.0) for database in rwr.constants.VALID_DATABASES}
 
-        click.echo('Saving the first {} {} players stats (ordered by {}, chunk size {})'.format(
-            players_count,
-            database,
-            players_sort,
-            chunks
-        ))
+    # Chunks of both databases are fetched ahead of time while the previous ones are persisted
+    players_chunks = rwr.scraper.iter_refreshed_players_blocks(
+        list(rwr.constants.VALID_DATABASES),
+        players_sort,
+        players_count,
+        concurrency=concurrency
+    )
 
-        for start in range(0, players_count, chunks):
-            click.echo('  Chunk start: {}'.format(start))
+    while True:
+        started_at = time.perf_counter()
 
-            players = rwr.scraper.get_players(database, sort=players_sort, start=start, limit=chunks)
+        database, start, rows = next(players_chunks, (None, None, None))
 
-            if not players:
-                click.secho('No more players to handle', fg='green')
+        if not database:
+            break
 
-                break
+        database_timings = timings[database]
+        database_timings['fetch'] += time.perf_counter() - started_at
 
-            all_player_names = [player.username for player in players]
+        click.echo('  {} chunk start: {}'.format(database, start))
 
-            existing_rwr_accounts = RwrAccount.query.filter(
-                RwrAccount.type == rwr_account_type,
-                RwrAccount.username.in_(all_player_names)
-            ).all()
+        players = [Player.load(database, row) for row in rows]
 
-            rwr_accounts_by_username = {rwr_account.username: rwr_account for rwr_account in existing_rwr_accounts}
+        started_at = time.perf_counter()
 
-            # Create RWR accounts if they do not exists / touch the updated_at timestamp if they exists
-            for player in players:
-                if player.username not in rwr_accounts_by_username:
-                    rwr_account = RwrAccount()
+        all_player_names = [player.username for player in players]
+
+        # Create RWR accounts if they do not exists / touch the updated_at timestamp if they exists
+        RwrAccount.upsert_many_by_type_and_usernames(database, all_player_names, update_existing=not create_accounts_only)
+
+        rwr_account_ids_by_username = RwrAccount.get_ids_by_type_and_usernames(database, all_player_names)
+
+        db.session.commit()
 
-                    rwr_account.username = player.username
-                    rwr_account.type = rwr_account_type
+        database_timings['accounts'] += time.perf_counter() - started_at
 
-                    rwr_accounts_by_username[player.username] = rwr_account
+        # Create all the RwrAccountStat objects for each players
+        if not create_accounts_only:
+            started_at = time.perf_counter()
 
-                elif not create_accounts_only:
-                    rwr_account = rwr_accounts_by_username[player.username]
+            # Get the latest RwrAccountStat object saved for all the RwrAccounts of this chunk at once
+            latest_rwr_accounts_stat = RwrAccountStat.get_latest_stats_for_rwr_accounts(
+                list(rwr_account_ids_by_username.values())
+            )
 
-                    rwr_account.updated_at = arrow.utcnow().floor('minute')
+            database_timings['latest stats'] += time.perf_counter() - started_at
 
-                db.session.add(rwr_account)
+            started_at = time.perf_counter()
 
+            all_rwr_accounts_stat = []
+
+            for player in players:
+                rwr_account_stat = RwrAccountStat()
+
+                rwr_account_stat.xp = player.xp
+                rwr_account_stat.kills = player.kills
+                rwr_account_stat.deaths = player.deaths
+                rwr_account_stat.time_played = player.time_played
+                rwr_account_stat.longest_kill_streak = player.longest_kill_streak
+                rwr_account_stat.targets_destroyed = player.targets_destroyed
+                rwr_account_stat.vehicles_destroyed = player.vehicles_destroyed
+                rwr_account_stat.soldiers_healed = player.soldiers_healed
+                rwr_account_stat.teamkills = player.teamkills
+                rwr_account_stat.distance_moved = player.distance_moved
+                rwr_account_stat.shots_fired = player.shots_fired
+                rwr_account_stat.throwables_thrown = player.throwables_thrown
+                rwr_account_stat.rwr_account_id = rwr_account_ids_by_username[player.username]
+
+                rwr_account_stat.compute_hash()
+
+                already_existing_rwr_account_stat = latest_rwr_accounts_stat.get(rwr_account_stat.rwr_account_id)
+
+                # Check if the player has been promoted
+                if already_existing_rwr_account_stat:
+                    previous_rank = rwr.utils.get_rank_from_xp(database, already_existing_rwr_account_stat.xp)
+                    current_rank = rwr.utils.get_rank_from_xp(database, rwr_account_stat.xp)
+
+                    rwr_account_stat.promoted_to_rank_id = current_rank.id if current_rank.id != previous_rank.id else None
+
+                # Check if the latest RwrAccountStats data is not the same
+                if not already_existing_rwr_account_stat or rwr_account_stat.promoted_to_rank_id or already_existing_rwr_account_stat.hash != rwr_account_stat.hash:
+                    all_rwr_accounts_stat.append(rwr_account_stat)
+
+            # Finally save stats for all eligible players
+            db.session.bulk_save_objects(all_rwr_accounts_stat)
             db.session.commit()
 
-            # Create all the RwrAccountStat objects for each players
-            if not create_accounts_only:
-                all_rwr_accounts_stat = []
-
-                for player in players:
-                    rwr_account_stat = RwrAccountStat()
-
-                    rwr_account_stat.xp = player.xp
-                    rwr_account_stat.kills = player.kills
-                    rwr_account_stat.deaths = player.deaths
-                    rwr_account_stat.time_played = player.time_played
-                    rwr_account_stat.longest_kill_streak = player.longest_kill_streak
-                    rwr_account_stat.targets_destroyed = player.targets_destroyed
-                    rwr_account_stat.vehicles_destroyed = player.vehicles_destroyed
-                    rwr_account_stat.soldiers_healed = player.soldiers_healed
-                    rwr_account_stat.teamkills = player.teamkills
-                    rwr_account_stat.distance_moved = player.distance_moved
-                    rwr_account_stat.shots_fired = player.shots_fired
-                    rwr_account_stat.throwables_thrown = player.throwables_thrown
-                    rwr_account_stat.rwr_account_id = rwr_accounts_by_username[player.username].id
-
-                    rwr_account_stat.compute_hash()
-
-                    # Get the latest RwrAccountStat object saved for this RwrAccount
-                    already_existing_rwr_account_stat = RwrAccountStat.query.filter(
-                        RwrAccountStat.rwr_account_id == rwr_account_stat.rwr_account_id
-                    ).order_by(RwrAccountStat.created_at.desc()).first()
-
-                    # Check if the player has been promoted
-                    if already_existing_rwr_account_stat:
-                        previous_rank = rwr.utils.get_rank_from_xp(database, already_existing_rwr_account_stat.xp)
-                        current_rank = rwr.utils.get_rank_from_xp(database, rwr_account_stat.xp)
-
-                        rwr_account_stat.promoted_to_rank_id = current_rank.id if current_rank.id != previous_rank.id else None
-
-                    # Check if the latest RwrAccountStats data is not the same
-                    if not already_existing_rwr_account_stat or rwr_account_stat.promoted_to_rank_id or already_existing_rwr_account_stat.hash != rwr_account_stat.hash:
-                        all_rwr_accounts_stat.append(rwr_account_stat)
-
-                # Finally save stats for all eligible players
-                db.session.bulk_save_objects(all_rwr_accounts_stat)
-                db.session.commit()
+            database_timings['stats'] += time.perf_counter() - started_at
+
+    for database, database_timings in timings.items():
+        click.echo('{} timings: {}'.format(database, ', '.join(['{} {:.2f}s'.format(phase, timing) for phase, timing in database_timings.items()])))
+
+    cache.delete_memoized(RwrAccountStat.get_evolution_series)
 
     click.echo('Pruning old stats...')
 
+    started_at = time.perf_counter()
+
     RwrAccountStat.query.filter(RwrAccountStat.created_at < one_year_ago()).delete()
+    RwrAccountStatArchive.query.filter(RwrAccountStatArchive.month < one_year_ago().floor('month')).delete()
     db.session.commit()
 
+    click.echo('Timings: pruning {:.2f}s'.format(time.perf_counter() - started_at))
+
     click.secho('Done', fg='green')
 
 
@@ -382,7 +626,7 @@ def save_players_stats(reset, create_accounts_only):
 @check_maintenance
 def delete_rwr_accounts_pending_deletion():
     """Delete RWR accounts which are pending deletion."""
-    from rwrs.models import RwrAccount, RwrAccountStat
+    from rwrs.models import RwrAccount, RwrAccountStat, RwrAccountStatArchive
     from app import db
 
     click.echo('Fetching accounts...')
@@ -391,6 +635,7 @@ def delete_rwr_accounts_pending_deletion():
 
     click.echo('Deleting accounts...')
 
+    RwrAccountStatArchive.query.filter(RwrAccountStatArchive.rwr_account_id.in_(rwr_account_ids)).delete()
     RwrAccountStat.query.filter(RwrAccountStat.rwr_account_id.in_(rwr_account_ids)).delete()
     RwrAccount.query.filter(RwrAccount.id.in_(rwr_account_ids)).delete()
 
@@ -400,41 +645,143 @@ def delete_rwr_accounts_pending_deletion():
 
 
 @app.cli.command()
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), help='Only compute promotions of stats created since this date')
+@click.option('--starting-id', type=int, default=0, help='Only compute promotions of RWR accounts having an ID greater than this one')
+@click.option('--limit', type=int, default=500, help='Number of RWR accounts processed at once')
 @check_maintenance
-def compute_promotions():
+def compute_promotions(since, starting_id, limit):
     """Compute promotions for all players."""
-    from rwrs.models import RwrAccount, RwrAccountStat
-    from rwrs import helpers
-    from app import db
+    from rwrs.models import RwrAccount, RwrAccountStat, RwrAccountStatArchive
+    from app import db, cache
     import rwr.utils
+    import numpy
+    import arrow
+    import time
 
-    if not click.confirm('This will reset all already-computed promotions prior computing. Proceed?'):
-        return
+    since = arrow.get(since) if since else None
 
-    click.echo('Resetting all already-computed promotions...')
+    click.echo('Computing promotions...')
 
-    RwrAccountStat.query.update({RwrAccountStat.promoted_to_rank_id: None})
-    db.session.commit()
+    started_at = time.perf_counter()
+    current_id = starting_id
+    processed = 0
+    updated = 0
+
+    while True:
+        rwr_accounts = db.session.query(RwrAccount.id, RwrAccount.type).filter(
+            RwrAccount.id > current_id
+        ).order_by(RwrAccount.id.asc()).limit(limit).all()
+
+        if not rwr_accounts:
+            break
+
+        databases = {rwr_account_id: type.value.lower() for rwr_account_id, type in rwr_accounts}
+        rows = RwrAccountStat.get_xp_history(list(databases.keys()), since)
 
-    for rwr_account in RwrAccount.query.yield_per(100):
-        database = rwr_account.type.value.lower()
+        if rows:
+            ids = numpy.array([row[0] for row in rows], dtype=numpy.int64)
+            rwr_account_ids = numpy.array([row[1] for row in rows], dtype=numpy.int64)
+            xp = numpy.array([row[3] for row in rows], dtype=numpy.int64)
+            current_promotions = numpy.array([row[4] if row[4] is not None else -1 for row in rows], dtype=numpy.int64)
+            rows_databases = numpy.array([databases[row[1]] for row in rows])
 
-        click.echo('{} / {}'.format(database, rwr_account.username))
+            rank_ids = numpy.empty(len(rows), dtype=numpy.int64)
 
-        rwr_account_stats = RwrAccountStat.query.filter(RwrAccountStat.rwr_account_id == rwr_account.id).order_by(RwrAccountStat.created_at.asc()).all()
+            for database in numpy.unique(rows_databases):
+                mask = rows_databases == database
+                rank_ids[mask] = rwr.utils.get_rank_ids_from_xp(database, xp[mask])
 
-        for previous_rwr_account_stat, current_rwr_account_stat, _ in helpers.previous_and_next(rwr_account_stats):
-            if not previous_rwr_account_stat:
-                continue
+            # Rank of the previous stat of the same RWR account (-1 = none)
+            first = numpy.concatenate([[True], numpy.diff(rwr_account_ids) != 0])
+            previous_rank_ids = numpy.concatenate([[-1], rank_ids[:-1]])
+            previous_rank_ids[first] = -1
 
-            previous_rank = rwr.utils.get_rank_from_xp(database, previous_rwr_account_stat.xp)
-            current_rank = rwr.utils.get_rank_from_xp(database, current_rwr_account_stat.xp)
+            # The stat preceding the first non-archived one of a RWR account is its latest archived one
+            latest_archived_xp = RwrAccountStatArchive.get_latest_archived_xp(list(databases.keys()))
 
-            current_rwr_account_stat.promoted_to_rank_id = current_rank.id if current_rank.id != previous_rank.id else None
+            for position in numpy.flatnonzero(first).tolist():
+                rwr_account_id = int(rwr_account_ids[position])
+
+                if rwr_account_id in latest_archived_xp:
+                    previous_rank_ids[position] = rwr.utils.get_rank_id_from_xp(databases[rwr_account_id], latest_archived_xp[rwr_account_id])
+
+            # A stat is a promotion if its rank differs from the one of the previous stat of the same RWR account (-1 = none)
+            promotions = numpy.full(len(rows), -1, dtype=numpy.int64)
+            promoted = (previous_rank_ids >= 0) & (rank_ids != previous_rank_ids)
+            promotions[promoted] = rank_ids[promoted]
+
+            to_update = promotions != current_promotions
+
+            if since: # Stats prior the given date are only used as a reference
+                to_update &= numpy.array([row[2] >= since for row in rows])
+
+            RwrAccountStat.update_promotions({
+                int(promoted_to_rank_id) if promoted_to_rank_id >= 0 else None: ids[to_update & (promotions == promoted_to_rank_id)].tolist()
+                for promoted_to_rank_id in numpy.unique(promotions[to_update])
+            })
+
+            db.session.commit()
+
+            processed += len(rows)
+            updated += int(to_update.sum())
+
+        current_id = rwr_accounts[-1][0]
+        elapsed = time.perf_counter() - started_at
+
+        click.echo('#{} ({} stats processed, {} updated, {:.0f} rows/s)'.format(
+            current_id,
+            processed,
+            updated,
+            processed / elapsed if elapsed else 0
+        ))
+
+    if updated:
+        cache.delete_memoized(RwrAccountStat.get_evolution_series)
+
+    click.echo('{} stats processed, {} updated in {:.2f}s'.format(processed, updated, time.perf_counter() - started_at))
+
+    click.secho('Done', fg='green')
+
+
+@app.cli.command()
+@click.option('--months', type=int, default=3, help='Number of past months of stats history left unarchived')
+@click.option('--starting-id', type=int, default=0, help='Only archive stats of RWR accounts having an ID greater than this one')
+@click.option('--limit', type=int, default=500, help='Number of RWR accounts processed at once')
+@check_maintenance
+def archive_stats(months, starting_id, limit):
+    """Pack old stats history in compact monthly archives."""
+    from rwrs.models import RwrAccount, RwrAccountStatArchive
+    from app import db
+    import arrow
+    import time
+
+    before = arrow.utcnow().floor('month').shift(months=-months)
+
+    click.echo('Archiving stats created before {}...'.format(before.format('YYYY-MM-DD')))
+
+    started_at = time.perf_counter()
+    current_id = starting_id
+    archived = 0
+
+    while True:
+        rwr_account_ids = [row[0] for row in db.session.query(RwrAccount.id).filter(
+            RwrAccount.id > current_id
+        ).order_by(RwrAccount.id.asc()).limit(limit).all()]
+
+        if not rwr_account_ids:
+            break
+
+        archived += RwrAccountStatArchive.archive(rwr_account_ids, before)
 
-        db.session.bulk_save_objects(rwr_account_stats)
         db.session.commit()
 
+        current_id = rwr_account_ids[-1]
+        elapsed = time.perf_counter() - started_at
+
+        click.echo('#{} ({} stats archived, {:.0f} rows/s)'.format(current_id, archived, archived / elapsed if elapsed else 0))
+
+    click.echo('{} stats archived in {:.2f}s'.format(archived, time.perf_counter() - started_at))
+
     click.secho('Done', fg='green')
 
 
@@ -486,7 +833,7 @@ def save_official_servers_mods():
 @check_maintenance
 def save_last_seen_players():
     """Save "last seen" date of current players."""
-    from rwrs.models import RwrAccount, RwrAccountType
+    from rwrs.models import RwrAccount
     from app import db
     import rwr.constants
     import rwr.scraper
@@ -504,27 +851,7 @@ def save_last_seen_players():
 
         click.echo(f'{len(all_player_names)} online players')
 
-        rwr_account_type = RwrAccountType(database.upper())
-
-        existing_rwr_accounts = RwrAccount.query.filter(
-            RwrAccount.type == rwr_account_type,
-            RwrAccount.username.in_(all_player_names)
-        ).all()
-
-        rwr_accounts_by_username = {rwr_account.username: rwr_account for rwr_account in existing_rwr_accounts}
-
-        for player_name in all_player_names:
-            if player_name not in rwr_accounts_by_username:
-                rwr_account = RwrAccount()
-
-                rwr_account.username = player_name
-                rwr_account.type = rwr_account_type
-            else:
-                rwr_account = rwr_accounts_by_username[player_name]
-
-            rwr_account.last_seen_at = arrow.utcnow().floor('minute')
-
-            db.session.add(rwr_account)
+        RwrAccount.upsert_many_by_type_and_usernames(database, all_player_names, last_seen_at=arrow.utcnow().floor('minute'))
 
         db.session.commit()
 
@@ -3,7 +3,7 @@ from rwrs.discord import constants, utils, embeds, components
 from flask_discord_interactions.models.embed import Field
 from app import app, cache, db, discord_interactions
 from flask_discord_interactions import Message
-from rwrs import helpers, steam_helpers, motd
+from rwrs import helpers, steam_helpers, motd, header
 from tabulate import tabulate
 from rwr.player import Player
 from flask import g
@@ -81,6 +81,8 @@ def motd_set(
     try:
         motd.set(type, message)
 
+        header.clear()
+
         return Message('MOTD updated.', ephemeral=True)
     except Exception as e:
         return Message('Error updating MOTD: {}'.format(e), ephemeral=True)
@@ -96,6 +98,8 @@ def motd_remove(
 ):
     try:
         if motd.remove():
+            header.clear()
+
             return Message('MOTD removed.', ephemeral=True)
         else:
             return Message('MOTD already removed.', ephemeral=True)
@@ -184,7 +188,8 @@ def event_set(
 
         db.session.commit()
 
-        cache.delete_memoized(rwr.scraper.get_servers)
+        rwr.scraper.refresh_servers_event()
+        header.clear()
 
         return Message('Event updated.', ephemeral=True)
     except (arrow.parser.ParserError, ValueError):
@@ -209,7 +214,8 @@ def event_remove(
 
             db.session.commit()
 
-            cache.delete_memoized(rwr.scraper.get_servers)
+            rwr.scraper.refresh_servers_event()
+            header.clear()
 
             return Message('Event removed.', ephemeral=True)
         except Exception as e:
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+from app import app, cache
+from rwr import caching
+
+CACHE_KEY = 'header'
+NOTICES_CACHE_KEY = 'header_notices'
+
+
+def _compute():
+    """Gather the counters displayed in the header of every page, then cache them."""
+    from rwrs.steam_helpers import get_current_players_count_for_app
+    import rwr.scraper
+
+    online_players, active_servers, total_servers = rwr.scraper.get_counters()
+
+    ret = SimpleNamespace(
+        total_players=get_current_players_count_for_app(app.config['RWR_STEAM_APP_ID']),
+        online_players=online_players,
+        active_servers=active_servers,
+        total_servers=total_servers
+    )
+
+    # No last known good copy is kept: the header is never served stale
+    cache.set(CACHE_KEY, ret, timeout=app.config['HEADER_CACHE_TIMEOUT'])
+
+    return ret
+
+
+def _compute_notices():
+    """Gather the MOTD and the next RWR event displayed in the header of every page, then cache them."""
+    from rwrs.models import Variable
+    from rwrs import motd
+
+    ret = SimpleNamespace(
+        motd=motd.get(),
+        event=Variable.get_event()
+    )
+
+    cache.set(NOTICES_CACHE_KEY, ret, timeout=app.config['HEADER_NOTICES_CACHE_TIMEOUT'])
+
+    return ret
+
+
+def get():
+    """Return the counters displayed in the header of every page, computed by a single worker at most once per servers
+    list or cache timeout."""
+    return caching.single_flight(CACHE_KEY, _compute)
+
+
+def get_notices():
+    """Return the MOTD and the next RWR event displayed in the header of every page (and used by the Discord bot),
+    computed by a single worker at most once per change or cache timeout."""
+    return caching.single_flight(NOTICES_CACHE_KEY, _compute_notices)
+
+
+def clear():
+    """Force the header counters and notices to be computed again on next request."""
+    cache.delete_many(CACHE_KEY, NOTICES_CACHE_KEY)
@@ -1,9 +1,13 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy_utils import ArrowType, UUIDType
 from sqlalchemy.util import memoized_property
+from flask_sqlalchemy import Pagination
 from flask import url_for, current_app
 from collections import OrderedDict
 from flask_login import UserMixin
 from app import db, cache, app
+from itertools import groupby
 from sqlalchemy import func
 from slugify import slugify
 from rwrs import helpers
@@ -12,8 +16,10 @@ import rwr.utils
 import hashlib
 import iso3166
 import arrow
+import numpy
 import json
 import uuid
+import zlib
 
 
 def one_week_ago():
@@ -26,6 +32,16 @@ def one_year_ago():
     return arrow.utcnow().floor('day').shift(years=-1)
 
 
+def period_start(date, period):
+    """Return an Arrow object of the start of the period of the given duration (in seconds) the given date is part of."""
+    return arrow.get(int(date.timestamp()) // period * period)
+
+
+def compute_stats_hash(values):
+    """Compute the hash of the given RwrAccountStat values (ordered as RwrAccountStat.HASHED_COLUMNS)."""
+    return hashlib.md5(':'.join([str(value) for value in values]).encode()).hexdigest()
+
+
 class Measurable:
     id = db.Column(db.Integer, primary_key=True, autoincrement=True) # TODO To remove because useless and non-efficient
 
@@ -37,40 +53,32 @@ class Measurable:
         """Given a list of date => number, convert the date to a string format."""
         return [{'t': row[0].format(format), 'v': value(row[1])} for row in rows]
 
+    @classmethod
+    def get_old_entries_batches(cls, batch_size=10000):
+        """Yield queries of the entries older than 1 week (exclusive) by batches of about batch_size entries, oldest
+        first, so they can be deleted without being loaded. A batch is determined once the previous one was handled."""
+        older_than = one_week_ago()
 
-class ServerPlayerCount(db.Model, Measurable):
-    class ServerPlayerCountQuery(db.Query):
-        def _get_base_count_query(self, count):
-            """Return the base query used to get the count."""
-            q = self.with_entities(ServerPlayerCount.measured_at.label('t'), count)
-
-            return q.filter(ServerPlayerCount.measured_at >= one_week_ago()).group_by('t')
+        while True:
+            # Entries measured at the same date are part of the same batch
+            batch_end = db.session.query(cls.measured_at).filter(
+                cls.measured_at < older_than
+            ).order_by(cls.measured_at.asc()).offset(batch_size - 1).limit(1).scalar()
 
-        def get_player_count(self, ip=None, port=None):
-            """Return the online players count, optionally filtered by a server's IP and port."""
-            q = self._get_base_count_query(func.sum(ServerPlayerCount.count).label('v'))
+            if batch_end is None: # Last batch
+                yield cls.query.filter(cls.measured_at < older_than)
 
-            if ip and port:
-                q = q.filter(ServerPlayerCount.ip == ip, ServerPlayerCount.port == port)
+                break
 
-            return q.all()
+            yield cls.query.filter(cls.measured_at <= batch_end)
 
-        def get_server_count(self, active_only=False):
-            """Return the online servers count, optionally filtered by the active ones only."""
-            q = self._get_base_count_query(func.count('*').label('v'))
-
-            if active_only:
-                q = q.filter(ServerPlayerCount.count > 0)
-
-            return q.all()
-
-        def get_old_entries(self):
-            """Return entries older than 1 weeks (exclusive)."""
-            return self.filter(ServerPlayerCount.measured_at < one_week_ago()).all()
 
+class ServerPlayerCount(db.Model, Measurable):
     __tablename__ = 'servers_player_count'
-    __table_args__ = (db.Index('ip_port_idx', 'ip', 'port'), )
-    query_class = ServerPlayerCountQuery
+    __table_args__ = (
+        db.Index('ip_port_idx', 'ip', 'port'),
+        db.Index('servers_measured_at_idx', 'measured_at')
+    )
 
     ip = db.Column(db.String(15), nullable=False)
     port = db.Column(db.Integer, nullable=False)
@@ -79,39 +87,214 @@ class ServerPlayerCount(db.Model, Measurable):
     @cache.memoize(timeout=app.config['GRAPHS_DATA_CACHE_TIMEOUT'])
     def server_players_data(ip=None, port=None):
         """Return the servers players chart data, optionally filtering by a server's IP and port."""
-        return Measurable.transform_data(ServerPlayerCount.query.get_player_count(ip, port))
+        if ip and port:
+            rows = ServerPlayerCountRollup.query.get_average('players_sum', ip, port)
+        else:
+            rows = ServerPlayerCountRollup.query.get_average('players_sum')
+
+        return Measurable.transform_data(rows, value=lambda v: round(v))
 
     @staticmethod
     @cache.memoize(timeout=app.config['GRAPHS_DATA_CACHE_TIMEOUT'])
     def servers_data(active_only=False):
         """Return the servers chart data, optionally filtering by active servers only."""
-        return Measurable.transform_data(ServerPlayerCount.query.get_server_count(active_only))
+        rows = ServerPlayerCountRollup.query.get_average('active_servers_sum' if active_only else 'servers_sum')
+
+        return Measurable.transform_data(rows, value=lambda v: round(v))
 
     def __repr__(self):
         return 'ServerPlayerCount:{}'.format(self.id)
 
 
+class ServerPlayerCountRollup(db.Model):
+    """Players count measures aggregated per period, either per server or for all servers (empty IP and port 0)."""
+    class ServerPlayerCountRollupQuery(db.Query):
+        def get_average(self, column, ip='', port=0):
+            """Return the average of the given column per GRAPHS_DATA_PERIOD over the last week, for the given server or for
+            all servers."""
+            q = self.with_entities(
+                ServerPlayerCountRollup.period_start,
+                getattr(ServerPlayerCountRollup, column),
+                ServerPlayerCountRollup.samples
+            ).filter(
+                ServerPlayerCountRollup.period == app.config['GRAPHS_DATA_PERIOD'],
+                ServerPlayerCountRollup.period_start >= one_week_ago(),
+                ServerPlayerCountRollup.ip == ip,
+                ServerPlayerCountRollup.port == port
+            ).order_by(ServerPlayerCountRollup.period_start.asc())
+
+            return [(period_start, value / samples) for period_start, value, samples in q.all()]
+
+        def get_old_entries_query(self):
+            """Return a query of the entries older than their period retention (exclusive)."""
+            return self.filter(db.or_(*[
+                db.and_(
+                    ServerPlayerCountRollup.period == period,
+                    ServerPlayerCountRollup.period_start < retention()
+                ) for period, retention in ServerPlayerCountRollup.PERIODS if retention
+            ]))
+
+    __tablename__ = 'servers_player_count_rollups'
+    __table_args__ = (db.Index('period_period_start_ip_port_idx', 'period', 'period_start', 'ip', 'port', unique=True), )
+    query_class = ServerPlayerCountRollupQuery
+
+    # Rollup periods (in seconds) along their retention
+    PERIODS = (
+        (5 * 60, one_week_ago),
+        (60 * 60, one_year_ago),
+        (24 * 60 * 60, None)
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+
+    period = db.Column(db.Integer, nullable=False)
+    period_start = db.Column(ArrowType, nullable=False)
+    ip = db.Column(db.String(15), nullable=False)
+    port = db.Column(db.Integer, nullable=False)
+    samples = db.Column(db.Integer, nullable=False)
+    players_sum = db.Column(db.Integer, nullable=False)
+    players_max = db.Column(db.Integer, nullable=False)
+    servers_sum = db.Column(db.Integer, nullable=False)
+    active_servers_sum = db.Column(db.Integer, nullable=False)
+
+    @staticmethod
+    def accumulate(rollups, measured_at, servers_count):
+        """Add the players count of every server ((IP, port) => count) measured at the given date to the given rollups
+        ((period, period start, IP, port) => ServerPlayerCountRollup), creating the missing ones.
+
+        Return the created rollups."""
+        created_rollups = []
+
+        measures = [(ip, port, count, 1, 1 if count > 0 else 0) for (ip, port), count in servers_count.items()]
+        measures.append(('', 0, sum(servers_count.values()), len(servers_count), sum(1 for count in servers_count.values() if count > 0)))
+
+        for period, _ in ServerPlayerCountRollup.PERIODS:
+            measured_period_start = period_start(measured_at, period)
+
+            for ip, port, players, servers, active_servers in measures:
+                key = (period, measured_period_start, ip, port)
+
+                rollup = rollups.get(key)
+
+                if not rollup:
+                    rollup = ServerPlayerCountRollup()
+                    rollup.period = period
+                    rollup.period_start = measured_period_start
+                    rollup.ip = ip
+                    rollup.port = port
+                    rollup.samples = rollup.players_sum = rollup.players_max = rollup.servers_sum = rollup.active_servers_sum = 0
+
+                    rollups[key] = rollup
+
+                    created_rollups.append(rollup)
+
+                rollup.samples += 1
+                rollup.players_sum += players
+                rollup.players_max = max(rollup.players_max, players)
+                rollup.servers_sum += servers
+                rollup.active_servers_sum += active_servers
+
+        return created_rollups
+
+    @staticmethod
+    def add_measures(measured_at, servers_count, chunk_size=50):
+        """Add the players count of every server ((IP, port) => count) measured at the given date to the rollups covering
+        this date."""
+        ServerPlayerCountRollup.upsert(ServerPlayerCountRollup.accumulate({}, measured_at, servers_count), chunk_size)
+
+    @staticmethod
+    def upsert(rollups, chunk_size=50):
+        """Add the given (transient) rollups to the stored ones, or store them if there isn't any yet for the same period,
+        period start, IP and port. This is done in one statement per chunk of rollups where supported, so concurrent calls
+        are safe."""
+        dialect = db.session.bind.dialect.name
+        sum_columns = ('samples', 'players_sum', 'servers_sum', 'active_servers_sum')
+
+        if dialect not in ('sqlite', 'postgresql', 'mysql'): # Other databases: fallback to the ORM
+            for start in range(0, len(rollups), chunk_size):
+                chunk = rollups[start:start + chunk_size]
+
+                existing_rollups = {
+                    (rollup.period, rollup.period_start, rollup.ip, rollup.port): rollup for rollup in ServerPlayerCountRollup.query.filter(db.or_(*[
+                        db.and_(
+                            ServerPlayerCountRollup.period == period,
+                            ServerPlayerCountRollup.period_start == rollup_period_start
+                        ) for period, rollup_period_start in {(rollup.period, rollup.period_start) for rollup in chunk}
+                    ])).all()
+                }
+
+                for rollup in chunk:
+                    existing_rollup = existing_rollups.get((rollup.period, rollup.period_start, rollup.ip, rollup.port))
+
+                    if not existing_rollup:
+                        db.session.add(rollup)
+
+                        continue
+
+                    for column in sum_columns:
+                        setattr(existing_rollup, column, getattr(existing_rollup, column) + getattr(rollup, column))
+
+                    existing_rollup.players_max = max(existing_rollup.players_max, rollup.players_max)
+
+            return
+
+        table = ServerPlayerCountRollup.__table__
+
+        rows = [{
+            column: getattr(rollup, column) for column in ('period', 'period_start', 'ip', 'port', 'players_max') + sum_columns
+        } for rollup in rollups]
+
+        for start in range(0, len(rows), chunk_size):
+            if dialect == 'mysql':
+                statement = mysql.insert(table).values(rows[start:start + chunk_size])
+                statement = statement.on_duplicate_key_update(
+                    players_max=func.greatest(table.c.players_max, statement.inserted.players_max),
+                    **{column: table.c[column] + statement.inserted[column] for column in sum_columns}
+                )
+            else:
+                statement = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(table).values(rows[start:start + chunk_size])
+                statement = statement.on_conflict_do_update(
+                    index_elements=['period', 'period_start', 'ip', 'port'],
+                    set_=dict(
+                        players_max=(func.max if dialect == 'sqlite' else func.greatest)(table.c.players_max, statement.excluded.players_max),
+                        **{column: table.c[column] + statement.excluded[column] for column in sum_columns}
+                    )
+                )
+
+            db.session.execute(statement)
+
+    def __repr__(self):
+        return 'ServerPlayerCountRollup:{}'.format(self.id)
+
+
 class SteamPlayerCount(db.Model, Measurable):
     class SteamPlayerCountQuery(db.Query):
         def get_player_count(self):
-            """Return the Steam players count."""
-            q = self.with_entities(SteamPlayerCount.measured_at.label('t'), SteamPlayerCount.count.label('v'))
-            q = q.filter(SteamPlayerCount.measured_at >= one_week_ago()).group_by('t')
+            """Return the average Steam players count per GRAPHS_DATA_PERIOD over the last week, like the servers players
+            count rollups."""
+            period = app.config['GRAPHS_DATA_PERIOD']
+            sums = OrderedDict()
 
-            return q.all()
+            q = self.with_entities(SteamPlayerCount.measured_at, SteamPlayerCount.count)
+            q = q.filter(SteamPlayerCount.measured_at >= one_week_ago()).order_by(SteamPlayerCount.measured_at.asc())
 
-        def get_old_entries(self):
-            """Return entries older than 1 weeks (exclusive)."""
-            return self.filter(SteamPlayerCount.measured_at < one_week_ago()).all()
+            for measured_at, count in q.all():
+                measured_period_start = period_start(measured_at, period)
+                total, samples = sums.get(measured_period_start, (0, 0))
+
+                sums[measured_period_start] = (total + count, samples + 1)
+
+            return [(measured_period_start, total / samples) for measured_period_start, (total, samples) in sums.items()]
 
     __tablename__ = 'steam_players_count'
+    __table_args__ = (db.Index('steam_measured_at_idx', 'measured_at'), )
     query_class = SteamPlayerCountQuery
 
     @staticmethod
     @cache.memoize(timeout=app.config['GRAPHS_DATA_CACHE_TIMEOUT'])
     def players_data():
         """Return the Steam players count chart data."""
-        return Measurable.transform_data(SteamPlayerCount.query.get_player_count())
+        return Measurable.transform_data(SteamPlayerCount.query.get_player_count(), value=lambda v: round(v))
 
     def __repr__(self):
         return 'SteamPlayerCount:{}'.format(self.id)
@@ -308,16 +491,7 @@ class UserFriend(db.Model):
     @memoized_property
     def playing_on_server(self):
         """Return the server this friend is currently playing on."""
-        servers = rwr.scraper.get_servers()
-
-        for server in servers:
-            if not server.players.list:
-                continue
-
-            if self.username in server.players.list:
-                return server
-
-        return None
+        return rwr.scraper.get_servers().get_by_player(self.username)
 
     def get_link(self, absolute=False):
         if not self.database:
@@ -425,6 +599,7 @@ class User(db.Model, UserMixin):
                 if user_rwr_account.username in usernames:
                     continue
 
+                RwrAccountStatArchive.query.filter(RwrAccountStatArchive.rwr_account_id == user_rwr_account.id).delete()
                 RwrAccountStat.query.filter(RwrAccountStat.rwr_account_id == user_rwr_account.id).delete()
 
                 db.session.delete(user_rwr_account)
@@ -622,7 +797,7 @@ class RwrAccountType(Enum):
 
 class RwrAccount(db.Model):
     __tablename__ = 'rwr_accounts'
-    __table_args__ = (db.Index('type_username_idx', 'type', 'username'), )
+    __table_args__ = (db.Index('type_username_idx', 'type', 'username', unique=True), )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
 
@@ -693,10 +868,43 @@ class RwrAccount(db.Model):
     def database_name(self):
         return self.type_display
 
-    @memoized_property
-    def ordered_stats(self):
-        """Return a query which have to be executed to get all RwrAccountStat linked to this RwrAccount."""
-        return RwrAccountStat.query.filter(RwrAccountStat.rwr_account_id == self.id).order_by(RwrAccountStat.created_at.desc())
+    def paginate_stats(self, page, per_page):
+        """Return a Pagination of all RwrAccountStat linked to this RwrAccount, most recent first, archived ones included."""
+        page = max(page, 1)
+        offset = (page - 1) * per_page
+
+        query = RwrAccountStat.query.filter(RwrAccountStat.rwr_account_id == self.id)
+        total = query.with_entities(func.count('*')).scalar()
+
+        items = query.order_by(RwrAccountStat.created_at.desc()).offset(offset).limit(per_page).all() if offset < total else []
+
+        # Archived stats are always older than the ones which aren't
+        offset = max(offset - total, 0)
+        archives = RwrAccountStatArchive.query.with_entities(
+            RwrAccountStatArchive.id,
+            RwrAccountStatArchive.count
+        ).filter(
+            RwrAccountStatArchive.rwr_account_id == self.id
+        ).order_by(RwrAccountStatArchive.month.desc()).all()
+
+        for archive_id, count in archives:
+            total += count
+
+            if len(items) >= per_page:
+                continue
+
+            if offset >= count:
+                offset -= count
+
+                continue
+
+            archived_rwr_account_stats = RwrAccountStatArchive.query.get(archive_id).get_stats(self)[::-1]
+
+            items.extend(archived_rwr_account_stats[offset:offset + per_page - len(items)])
+
+            offset = 0
+
+        return Pagination(None, page, per_page, total, items)
 
     @memoized_property
     def has_stats(self):
@@ -760,6 +968,68 @@ class RwrAccount(db.Model):
 
         return rwr_accounts
 
+    @staticmethod
+    def upsert_many_by_type_and_usernames(type, usernames, update_existing=True, chunk_size=100, **values):
+        """Create all RwrAccount matching the given type and usernames which doesn't exist, and touch the existing ones,
+        setting them the given column values. This is done in one statement per chunk of usernames where supported."""
+        type = RwrAccountType(type.upper())
+        usernames = list(dict.fromkeys(usernames))
+        now = arrow.utcnow().floor('minute')
+        update_values = dict(values, updated_at=now)
+        dialect = db.session.bind.dialect.name
+        table = RwrAccount.__table__
+
+        for start in range(0, len(usernames), chunk_size):
+            chunk_usernames = usernames[start:start + chunk_size]
+
+            if dialect in ('sqlite', 'postgresql', 'mysql'):
+                rows = [
+                    dict(update_values, type=type, username=username, pending_delete=False, created_at=now) for username in chunk_usernames
+                ]
+
+                if dialect == 'mysql':
+                    statement = mysql.insert(table).values(rows)
+                    statement = statement.on_duplicate_key_update(**(update_values if update_existing else {'id': table.c.id}))
+                else:
+                    statement = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(table).values(rows)
+
+                    if update_existing:
+                        statement = statement.on_conflict_do_update(index_elements=['type', 'username'], set_=update_values)
+                    else:
+                        statement = statement.on_conflict_do_nothing(index_elements=['type', 'username'])
+
+                db.session.execute(statement)
+            else: # Other databases: fallback to the ORM
+                rwr_accounts_by_username = {rwr_account.username: rwr_account for rwr_account in RwrAccount.query.filter(
+                    RwrAccount.type == type,
+                    RwrAccount.username.in_(chunk_usernames)
+                ).all()}
+
+                for username in chunk_usernames:
+                    if username not in rwr_accounts_by_username:
+                        rwr_account = RwrAccount()
+                        rwr_account.type = type
+                        rwr_account.username = username
+                    elif update_existing:
+                        rwr_account = rwr_accounts_by_username[username]
+                    else:
+                        continue
+
+                    for name, value in update_values.items():
+                        setattr(rwr_account, name, value)
+
+                    db.session.add(rwr_account)
+
+    @staticmethod
+    def get_ids_by_type_and_usernames(type, usernames):
+        """Return the ID of all RwrAccount matching the given type and usernames, indexed by username."""
+        type = RwrAccountType(type.upper())
+
+        return dict(db.session.query(RwrAccount.username, RwrAccount.id).filter(
+            RwrAccount.type == type,
+            RwrAccount.username.in_(usernames)
+        ).all())
+
     def __repr__(self):
         return 'RwrAccount:{}'.format(self.id)
 
@@ -791,65 +1061,187 @@ class RwrAccountStat(db.Model):
 
     rwr_account_id = db.Column(db.Integer, db.ForeignKey('rwr_accounts.id'), nullable=False)
 
+    HASHED_COLUMNS = (
+        'xp',
+        'kills',
+        'deaths',
+        'time_played',
+        'longest_kill_streak',
+        'targets_destroyed',
+        'vehicles_destroyed',
+        'soldiers_healed',
+        'teamkills',
+        'distance_moved',
+        'shots_fired',
+        'throwables_thrown',
+        'rwr_account_id'
+    )
+
     def compute_hash(self):
         """Compute the hash corresponding to the data of this RwrAccountStat."""
-        data = [
-            self.xp,
-            self.kills,
-            self.deaths,
-            self.time_played,
-            self.longest_kill_streak,
-            self.targets_destroyed,
-            self.vehicles_destroyed,
-            self.soldiers_healed,
-            self.teamkills,
-            self.distance_moved,
-            self.shots_fired,
-            self.throwables_thrown,
-            self.rwr_account_id
-        ]
+        self.hash = compute_stats_hash([getattr(self, column) for column in self.HASHED_COLUMNS])
 
-        data = [str(d) for d in data]
-        data = ':'.join(data).encode()
+    @staticmethod
+    def get_stats_for_date(rwr_account_id, date):
+        """Return the most recent RwrAccountStat for the given rwr_account_id and date (arrow instance), looking in
+        archives if needed."""
+        date = date.floor('day')
+
+        rwr_account_stat = RwrAccountStat.query.filter(
+            RwrAccountStat.rwr_account_id == rwr_account_id,
+            RwrAccountStat.created_at <= date
+        ).order_by(RwrAccountStat.created_at.desc()).first()
 
-        self.hash = hashlib.md5(data).hexdigest()
+        if rwr_account_stat:
+            return rwr_account_stat
+
+        archives = RwrAccountStatArchive.query.filter(
+            RwrAccountStatArchive.rwr_account_id == rwr_account_id,
+            RwrAccountStatArchive.month <= date
+        ).order_by(RwrAccountStatArchive.month.desc())
+
+        for archive in archives:
+            archived_rwr_account_stats = [
+                archived_rwr_account_stat for archived_rwr_account_stat in archive.get_stats(RwrAccount.query.get(rwr_account_id)) if archived_rwr_account_stat.created_at <= date
+            ]
+
+            if archived_rwr_account_stats:
+                return archived_rwr_account_stats[-1]
+
+        return None
 
     @staticmethod
-    def transform_data(rows, column, format='YYYY-MM-DD'):
-        """Given a list of RwrAccountStat, convert to a list exploitable to be displayed in a chart."""
-        return [{
-            't': row.created_at.format(format) if format else row.created_at,
-            'v': getattr(row, column),
-            'ptr': row.promoted_to_rank.name if row.promoted_to_rank else None
-        } for row in rows]
+    def get_latest_stats_for_rwr_accounts(rwr_account_ids):
+        """Return the most recent RwrAccountStat of each of the given rwr_account_ids, indexed by rwr_account_id."""
+        latest_created_at = db.session.query(
+            RwrAccountStat.rwr_account_id,
+            func.max(RwrAccountStat.created_at).label('created_at')
+        ).filter(
+            RwrAccountStat.rwr_account_id.in_(rwr_account_ids)
+        ).group_by(RwrAccountStat.rwr_account_id).subquery()
+
+        rwr_account_stats = RwrAccountStat.query.join(
+            latest_created_at,
+            db.and_(
+                RwrAccountStat.rwr_account_id == latest_created_at.c.rwr_account_id,
+                RwrAccountStat.created_at == latest_created_at.c.created_at
+            )
+        ).order_by(RwrAccountStat.id.asc()).all()
+
+        return {rwr_account_stat.rwr_account_id: rwr_account_stat for rwr_account_stat in rwr_account_stats}
 
     @staticmethod
-    def get_stats_for_date(rwr_account_id, date):
-        """Return the most recent RwrAccountStat for the given rwr_account_id and date (arrow instance)."""
-        return RwrAccountStat.query.filter(
-            RwrAccountStat.rwr_account_id == rwr_account_id,
-            RwrAccountStat.created_at <= date.floor('day')
-        ).order_by(RwrAccountStat.created_at.desc()).first()
+    def get_xp_history(rwr_account_ids, since=None):
+        """Return the (id, rwr_account_id, created_at, xp, promoted_to_rank_id) of all the RwrAccountStat of the given
+        rwr_account_ids, sorted by rwr_account_id then created_at. If since (arrow instance) is given, only the ones created
+        since this date are returned, along the latest one before this date of each rwr_account_id."""
+        query = db.session.query(
+            RwrAccountStat.id,
+            RwrAccountStat.rwr_account_id,
+            RwrAccountStat.created_at,
+            RwrAccountStat.xp,
+            RwrAccountStat.promoted_to_rank_id
+        ).filter(
+            RwrAccountStat.rwr_account_id.in_(rwr_account_ids)
+        )
+
+        if since:
+            previous_created_at = db.session.query(
+                RwrAccountStat.rwr_account_id,
+                func.max(RwrAccountStat.created_at).label('created_at')
+            ).filter(
+                RwrAccountStat.rwr_account_id.in_(rwr_account_ids),
+                RwrAccountStat.created_at < since
+            ).group_by(RwrAccountStat.rwr_account_id).subquery()
+
+            query = query.outerjoin(
+                previous_created_at,
+                RwrAccountStat.rwr_account_id == previous_created_at.c.rwr_account_id
+            ).filter(
+                db.or_(
+                    RwrAccountStat.created_at >= since,
+                    RwrAccountStat.created_at == previous_created_at.c.created_at
+                )
+            )
+
+        return query.order_by(RwrAccountStat.rwr_account_id.asc(), RwrAccountStat.created_at.asc()).all()
 
     @staticmethod
-    @cache.memoize(timeout=app.config['GRAPHS_DATA_CACHE_TIMEOUT'])
-    def get_stats_for_column(rwr_account, column=None):
-        """Return the player's score or K/D ratio evolution data."""
-        rwr_account_stats = RwrAccountStat.query.filter(
-            RwrAccountStat.rwr_account_id == rwr_account.id
+    def update_promotions(promotions, chunk_size=1000):
+        """Set the promoted_to_rank_id of RwrAccountStat given a dict of RwrAccountStat IDs lists indexed by
+        promoted_to_rank_id (None included), using one UPDATE statement per chunk of IDs. Changes aren't committed."""
+        for promoted_to_rank_id, rwr_account_stat_ids in promotions.items():
+            for start in range(0, len(rwr_account_stat_ids), chunk_size):
+                RwrAccountStat.query.filter(
+                    RwrAccountStat.id.in_(rwr_account_stat_ids[start:start + chunk_size])
+                ).update(
+                    {RwrAccountStat.promoted_to_rank_id: promoted_to_rank_id},
+                    synchronize_session=False
+                )
+
+    @staticmethod
+    @cache.memoize(timeout=app.config['PLAYERS_EVOLUTION_CACHE_TIMEOUT'])
+    def get_evolution_series(rwr_account_id, database):
+        """Return the player's score and K/D ratio evolution data as columns, most recent first."""
+        rows = db.session.query(
+            RwrAccountStat.created_at,
+            RwrAccountStat.kills,
+            RwrAccountStat.deaths,
+            RwrAccountStat.promoted_to_rank_id
+        ).filter(
+            RwrAccountStat.rwr_account_id == rwr_account_id
         ).order_by(RwrAccountStat.created_at.desc()).all()
 
-        # Set RwrAccount relations now to prevent lazy loading issue (and to prevent extra DB query)
-        for rwr_account_stat in rwr_account_stats:
-            rwr_account_stat.rwr_account = rwr_account
+        archived = RwrAccountStatArchive.get_history(rwr_account_id)
+
+        # Archived stats are always older than the ones which aren't
+        created_at = numpy.concatenate([
+            numpy.array([row[0].int_timestamp for row in rows], dtype=numpy.int64),
+            archived['created_at'][::-1]
+        ]).astype('datetime64[s]')
+        kills = numpy.concatenate([numpy.array([row[1] for row in rows], dtype=numpy.int64), archived['kills'][::-1]])
+        deaths = numpy.concatenate([numpy.array([row[2] for row in rows], dtype=numpy.int64), archived['deaths'][::-1]])
+        promoted_to_rank_ids = [row[3] for row in rows] + [
+            rank_id if rank_id >= 0 else None for rank_id in archived['promoted_to_rank_id'][::-1].tolist()
+        ]
+
+        ranks_name = {}
+
+        for promoted_to_rank_id in {rank_id for rank_id in promoted_to_rank_ids if rank_id}:
+            ranks_name[promoted_to_rank_id] = rwr.utils.get_rank_object(database, promoted_to_rank_id).name
+
+        return {
+            'created_at': created_at,
+            'kd_ratio': numpy.round(numpy.divide(kills, deaths, out=numpy.zeros(len(created_at)), where=deaths > 0), 2),
+            'score': kills - deaths,
+            'promoted_to_rank': [ranks_name[rank_id] if rank_id else None for rank_id in promoted_to_rank_ids]
+        }
+
+    @staticmethod
+    def get_stats_for_column(rwr_account, column=None):
+        """Return the player's score or K/D ratio evolution data."""
+        series = RwrAccountStat.get_evolution_series(rwr_account.id, rwr_account.database)
 
         if not column:
+            dates = numpy.datetime_as_string(series['created_at'], unit='D').tolist()
+
             return {
-                'ratio': RwrAccountStat.transform_data(rwr_account_stats, 'kd_ratio'),
-                'score': RwrAccountStat.transform_data(rwr_account_stats, 'score'),
+                'ratio': RwrAccountStat.transform_data(dates, series['kd_ratio'], series['promoted_to_rank']),
+                'score': RwrAccountStat.transform_data(dates, series['score'], series['promoted_to_rank']),
             }
         else:
-            return RwrAccountStat.transform_data(rwr_account_stats, column, format=None)
+            dates = [arrow.get(timestamp) for timestamp in series['created_at'].astype(numpy.int64).tolist()]
+
+            return RwrAccountStat.transform_data(dates, series[column], series['promoted_to_rank'])
+
+    @staticmethod
+    def transform_data(dates, values, promoted_to_rank):
+        """Given dates, values and promotions columns, convert to a list exploitable to be displayed in a chart."""
+        return [{
+            't': date,
+            'v': value,
+            'ptr': rank_name
+        } for date, value, rank_name in zip(dates, values.tolist(), promoted_to_rank)]
 
     @memoized_property
     def promoted_to_rank(self):
@@ -913,3 +1305,189 @@ class RwrAccountStat(db.Model):
 
     def __repr__(self):
         return 'RwrAccountStat:{}'.format(self.id)
+
+
+class RwrAccountStatArchive(db.Model):
+    """Stats history of a RWR account for a given month, packed in a compressed binary blob.
+
+    The integer columns of the first RwrAccountStat of the month are stored as-is (keyframe), the ones of the following
+    RwrAccountStat as the difference with their previous one (deltas), which are small and compress well."""
+    __tablename__ = 'rwr_account_stat_archives'
+    __table_args__ = (db.Index('rwr_account_id_month_idx', 'rwr_account_id', 'month', unique=True), )
+
+    # created_at is stored as a timestamp and a NULL promoted_to_rank_id as -1. distance_moved is stored as-is after them
+    INTEGER_COLUMNS = (
+        'created_at',
+        'xp',
+        'kills',
+        'deaths',
+        'time_played',
+        'longest_kill_streak',
+        'targets_destroyed',
+        'vehicles_destroyed',
+        'soldiers_healed',
+        'teamkills',
+        'shots_fired',
+        'throwables_thrown',
+        'promoted_to_rank_id'
+    )
+
+    COLUMNS = INTEGER_COLUMNS + ('distance_moved', )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+
+    month = db.Column(ArrowType, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    rwr_account_id = db.Column(db.Integer, db.ForeignKey('rwr_accounts.id'), nullable=False)
+
+    @staticmethod
+    def pack(columns):
+        """Pack the given columns (dict of NumPy arrays, sorted by created_at) in a binary blob."""
+        integers = numpy.column_stack([columns[column] for column in RwrAccountStatArchive.INTEGER_COLUMNS]).astype('<i8')
+        deltas = numpy.diff(integers, axis=0, prepend=numpy.zeros((1, integers.shape[1]), dtype='<i8'))
+
+        return zlib.compress(deltas.tobytes() + columns['distance_moved'].astype('<f8').tobytes(), 9)
+
+    def unpack(self):
+        """Return the columns (dict of NumPy arrays, sorted by created_at) packed in this archive."""
+        raw = zlib.decompress(self.data)
+        integers_count = self.count * len(self.INTEGER_COLUMNS)
+
+        integers = numpy.cumsum(numpy.frombuffer(raw, dtype='<i8', count=integers_count).reshape(self.count, -1), axis=0)
+
+        columns = {column: integers[:, i] for i, column in enumerate(self.INTEGER_COLUMNS)}
+        columns['distance_moved'] = numpy.frombuffer(raw, dtype='<f8', offset=integers_count * 8)
+
+        return columns
+
+    @staticmethod
+    def concatenate(columns_list):
+        """Concatenate the given list of columns (dict of NumPy arrays)."""
+        return {
+            column: numpy.concatenate(
+                [columns[column] for columns in columns_list] or [numpy.empty(0, dtype=numpy.float64 if column == 'distance_moved' else numpy.int64)]
+            ) for column in RwrAccountStatArchive.COLUMNS
+        }
+
+    def get_stats(self, rwr_account=None):
+        """Return the RwrAccountStat packed in this archive, sorted by created_at. They are transient and must not be
+        persisted."""
+        columns = {column: values.tolist() for column, values in self.unpack().items()}
+        ret = []
+
+        for i in range(self.count):
+            rwr_account_stat = RwrAccountStat(**{
+                column: columns[column][i] for column in self.COLUMNS if column not in ('created_at', 'promoted_to_rank_id')
+            })
+
+            rwr_account_stat.created_at = arrow.get(columns['created_at'][i])
+            rwr_account_stat.promoted_to_rank_id = columns['promoted_to_rank_id'][i] if columns['promoted_to_rank_id'][i] >= 0 else None
+            rwr_account_stat.rwr_account_id = self.rwr_account_id
+
+            rwr_account_stat.compute_hash()
+
+            if rwr_account:
+                set_committed_value(rwr_account_stat, 'rwr_account', rwr_account)
+
+            ret.append(rwr_account_stat)
+
+        return ret
+
+    @staticmethod
+    def get_history(rwr_account_id):
+        """Return the archived stats history of the given rwr_account_id as columns (dict of NumPy arrays), oldest first."""
+        archives = RwrAccountStatArchive.query.filter(
+            RwrAccountStatArchive.rwr_account_id == rwr_account_id
+        ).order_by(RwrAccountStatArchive.month.asc()).all()
+
+        return RwrAccountStatArchive.concatenate([archive.unpack() for archive in archives])
+
+    @staticmethod
+    def get_latest_archived_xp(rwr_account_ids):
+        """Return the XP of the most recent archived RwrAccountStat of each of the given rwr_account_ids having archives,
+        indexed by rwr_account_id."""
+        latest_month = db.session.query(
+            RwrAccountStatArchive.rwr_account_id,
+            func.max(RwrAccountStatArchive.month).label('month')
+        ).filter(
+            RwrAccountStatArchive.rwr_account_id.in_(rwr_account_ids)
+        ).group_by(RwrAccountStatArchive.rwr_account_id).subquery()
+
+        archives = RwrAccountStatArchive.query.join(
+            latest_month,
+            db.and_(
+                RwrAccountStatArchive.rwr_account_id == latest_month.c.rwr_account_id,
+                RwrAccountStatArchive.month == latest_month.c.month
+            )
+        ).all()
+
+        return {archive.rwr_account_id: int(archive.unpack()['xp'][-1]) for archive in archives}
+
+    @staticmethod
+    def archive(rwr_account_ids, before, chunk_size=1000):
+        """Move the RwrAccountStat of the given rwr_account_ids created before the given date (arrow instance, start of a
+        month) to archives, except the latest one of each rwr_account_id so it can still be compared with new stats.
+        Existing archives are merged. Changes aren't committed.
+
+        Return the number of archived RwrAccountStat."""
+        latest_ids = {
+            rwr_account_stat.id for rwr_account_stat in RwrAccountStat.get_latest_stats_for_rwr_accounts(rwr_account_ids).values()
+        }
+
+        rows = [row for row in db.session.query(
+            RwrAccountStat.id,
+            RwrAccountStat.rwr_account_id,
+            *[getattr(RwrAccountStat, column) for column in RwrAccountStatArchive.COLUMNS]
+        ).filter(
+            RwrAccountStat.rwr_account_id.in_(rwr_account_ids),
+            RwrAccountStat.created_at < before
+        ).order_by(
+            RwrAccountStat.rwr_account_id.asc(),
+            RwrAccountStat.created_at.asc()
+        ).all() if row[0] not in latest_ids]
+
+        if not rows:
+            return 0
+
+        existing_archives = {
+            (archive.rwr_account_id, archive.month): archive for archive in RwrAccountStatArchive.query.filter(
+                RwrAccountStatArchive.rwr_account_id.in_(rwr_account_ids),
+                RwrAccountStatArchive.month < before
+            ).all()
+        }
+
+        for (rwr_account_id, month), month_rows in groupby(rows, key=lambda row: (row[1], row[2].floor('month'))):
+            month_rows = list(month_rows)
+
+            columns = {column: numpy.array([row[i + 2] for row in month_rows]) for i, column in enumerate(RwrAccountStatArchive.COLUMNS)}
+            columns['created_at'] = numpy.array([row[2].int_timestamp for row in month_rows], dtype=numpy.int64)
+            columns['promoted_to_rank_id'] = numpy.array([row[-2] if row[-2] is not None else -1 for row in month_rows], dtype=numpy.int64)
+            columns['distance_moved'] = columns['distance_moved'].astype(numpy.float64)
+
+            archive = existing_archives.get((rwr_account_id, month))
+
+            if archive:
+                columns = RwrAccountStatArchive.concatenate([archive.unpack(), columns])
+                order = numpy.argsort(columns['created_at'], kind='stable')
+                columns = {column: values[order] for column, values in columns.items()}
+            else:
+                archive = RwrAccountStatArchive()
+                archive.rwr_account_id = rwr_account_id
+                archive.month = month
+
+                db.session.add(archive)
+
+            archive.count = len(columns['created_at'])
+            archive.data = RwrAccountStatArchive.pack(columns)
+
+        ids = [row[0] for row in rows]
+
+        for start in range(0, len(ids), chunk_size):
+            RwrAccountStat.query.filter(RwrAccountStat.id.in_(ids[start:start + chunk_size])).delete(synchronize_session=False)
+
+        return len(rows)
+
+    def __repr__(self):
+        return 'RwrAccountStatArchive:{}'.format(self.id)
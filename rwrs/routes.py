@@ -530,10 +530,9 @@ def player_details(database, username, tab=None):
             if not per_page or per_page > app.config['LIST_PAGE_SIZES'][-1]:
                 per_page = app.config['LIST_PAGE_SIZES'][0]
 
-            stats = player.rwr_account.ordered_stats.paginate(
+            stats = player.rwr_account.paginate_stats(
                 page=request.args.get('page', 1, type=int),
-                per_page=per_page,
-                error_out=False
+                per_page=per_page
             )
         elif tab == 'evolution':
             player_evolution_data = RwrAccountStat.get_stats_for_column(player.rwr_account)
@@ -666,15 +665,17 @@ def players_compare(database, username, username_to_compare_with=None, date=None
 def servers_list():
     filters = request.args.to_dict()
 
+    all_servers = rwr.scraper.get_servers()
+
     if filters:
-        servers = rwr.scraper.filter_servers(**filters)
+        servers = all_servers.filter(filters)
     else:
-        servers = rwr.scraper.get_servers()
+        servers = all_servers
 
-    locations = rwr.scraper.get_all_servers_locations()
-    types = rwr.scraper.get_all_servers_types()
-    modes = rwr.scraper.get_all_servers_modes()
-    maps = rwr.scraper.get_all_servers_maps()
+    locations = rwr.scraper.get_all_servers_locations(all_servers)
+    types = rwr.scraper.get_all_servers_types(all_servers)
+    modes = rwr.scraper.get_all_servers_modes(all_servers)
+    maps = rwr.scraper.get_all_servers_maps(all_servers)
 
     if request.args.get('view') == 'extended':
         g.LAYOUT = 'large'
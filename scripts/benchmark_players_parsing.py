@@ -0,0 +1,87 @@
+"""Players parsing benchmark
+
+Measures the time needed to parse the rows of the sample view_players.php pages in tests/fixtures (a full page of 100
+players and a last page of 37 players), using the former parser (the whole text decoded by requests, queried by XPath,
+then usernames decoded again as UTF-8) and the one-pass streamed parser (rwr.scraper._iter_html_rows).
+
+Usage (from the project root, with the same env variables as the app): python scripts/benchmark_players_parsing.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app # Imported first, as the rwr package depends on it
+from lxml import html
+import rwr.scraper
+import timeit
+import io
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'fixtures')
+FIXTURES = ('view_players_full.html', 'view_players_last.html')
+REPEAT = 20
+
+
+class FakeResponse:
+    """A requests' streamed response to a view_players.php call, served as UTF-8 without charset like the real one."""
+    class Raw(io.BytesIO):
+        decode_content = False
+
+    def __init__(self, content):
+        self.content = content
+        self.raw = self.Raw(content)
+        self.encoding = 'ISO-8859-1' # What requests infers for text/html without charset
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def parse_with_former_parser(content):
+    """Parse a view_players.php page as before _iter_html_rows."""
+    rows = []
+
+    for node in html.fromstring(FakeResponse(content).text).xpath('//table/tr[position() > 1]'):
+        cells = [cell.text for cell in node]
+        cells[1] = cells[1].encode('iso-8859-1').decode('utf-8')
+
+        rows.append(tuple(cells))
+
+    return rows
+
+
+def parse_with_iter_html_rows(content):
+    """Parse a view_players.php page using _iter_html_rows, streamed from a fake response."""
+    rwr.scraper._get = lambda *args, **kwargs: FakeResponse(content)
+
+    return list(rwr.scraper._iter_html_rows(rwr.scraper.players_base_url + 'view_players.php'))
+
+
+def main():
+    print('Per page:')
+    print('  {:<24} {:>6} {:>10} {:>10}'.format('Page', 'Rows', 'Former', 'One-pass'))
+
+    for fixture in FIXTURES:
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            content = f.read()
+
+        rows = parse_with_former_parser(content)
+
+        assert parse_with_iter_html_rows(content) == rows, fixture
+
+        print('  {:<24} {:>6} {:>7.3f} ms {:>7.3f} ms'.format(
+            fixture,
+            len(rows),
+            min(timeit.repeat(lambda: parse_with_former_parser(content), number=REPEAT, repeat=5)) / REPEAT * 1000,
+            min(timeit.repeat(lambda: parse_with_iter_html_rows(content), number=REPEAT, repeat=5)) / REPEAT * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Servers list fetching benchmark
+
+Serves generated get_server_list.php pages from a local HTTP server answering every request after a fake latency, then
+measures how long fetching and parsing the whole servers list takes for several SERVERS_FETCH_CONCURRENCY values.
+
+Usage (from the project root, with the same env variables as the app): python scripts/benchmark_servers_fetch.py
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+import rwr.scraper
+import threading
+import random
+import time
+
+SERVERS = 2000
+LATENCY = 0.3 # Seconds
+CONCURRENCIES = (1, 2, 4, 8)
+
+MAPS = (
+    ('vanilla', 'map1'),
+    ('vanilla.winter', 'map4'),
+    ('vanilla.desert', 'map6'),
+    ('pacific', 'island1'),
+    ('edelweiss', 'edelweiss2'),
+    ('man_vs_world_mp', 'lobby_2p'),
+)
+
+MODES = ('COOP', 'DOM', 'PvP', 'PvE', 'PvPvE')
+
+
+def generate_server(i, last=False):
+    """Return the <server> XML node of the i-th generated server, as returned by get_server_list.php."""
+    server_random = random.Random(i)
+    server_type, map_id = server_random.choice(MAPS)
+    max_players = server_random.choice((8, 16, 32, 64))
+    players = ['PLAYER{}'.format(server_random.randrange(100000)) for _ in range(server_random.randrange(max_players + 1))]
+
+    return (
+        '<server{last}>'
+        '<name><![CDATA[Server #{i}]]></name>'
+        '<address>10.{a}.{b}.{c}</address>'
+        '<port>{port}</port>'
+        '<map_id>media/packages/{server_type}/maps/{map_id}</map_id>'
+        '<map_name>{map_id}</map_name>'
+        '<bots>{bots}</bots>'
+        '<current_players>{current_players}</current_players>'
+        '<timeout>0</timeout>'
+        '<version>1.{version}</version>'
+        '<dedicated>1</dedicated>'
+        '<mod>0</mod>'
+        '{players}'
+        '<comment><![CDATA[Welcome to server #{i}]]></comment>'
+        '<url><![CDATA[https://example.com/{i}]]></url>'
+        '<max_players>{max_players}</max_players>'
+        '<mode>{mode}</mode>'
+        '<realm>{realm}</realm>'
+        '</server>'
+    ).format(
+        last=' last="1"' if last else '',
+        i=i,
+        a=i // 65536 % 256,
+        b=i // 256 % 256,
+        c=i % 256,
+        port=1234 + i % 10,
+        server_type=server_type,
+        map_id=map_id,
+        bots=server_random.randrange(100),
+        current_players=len(players),
+        version=server_random.choice((95, 96, 97)),
+        players=''.join('<player>{}</player>'.format(escape(player)) for player in players),
+        max_players=max_players,
+        mode=server_random.choice(MODES),
+        realm=server_random.choice(('', 'official_invasion', 'official_pacific'))
+    )
+
+
+def generate_servers_page(start, size, total):
+    """Return the get_server_list.php XML page listing the given window of the total generated servers."""
+    return '<?xml version="1.0" encoding="utf-8"?><result>{}</result>'.format(''.join(
+        generate_server(i, last=i == total - 1) for i in range(start, min(start + size, total))
+    ))
+
+
+class ServersListHandler(BaseHTTPRequestHandler):
+    pages = {}
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        start = int(params['start'][0])
+        size = int(params['size'][0])
+
+        if (start, size) not in self.pages:
+            self.pages[(start, size)] = generate_servers_page(start, size, SERVERS).encode('utf-8')
+
+        body = self.pages[(start, size)]
+
+        time.sleep(LATENCY)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ServersListHandler)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    rwr.scraper.servers_base_url = 'http://127.0.0.1:{}/'.format(server.server_port)
+
+    print('{} servers, {} ms of latency per page'.format(SERVERS, int(LATENCY * 1000)))
+
+    with app.app_context():
+        rwr.scraper._get_servers_pages() # Warm up (pages generation, connections)
+
+        for concurrency in CONCURRENCIES:
+            app.config['SERVERS_FETCH_CONCURRENCY'] = concurrency
+
+            started_at = time.perf_counter()
+            servers = rwr.scraper._get_servers_pages()
+            elapsed = time.perf_counter() - started_at
+
+            assert len(servers) == SERVERS
+
+            print('  Concurrency {:<2} {:>8.2f} s'.format(concurrency, elapsed))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
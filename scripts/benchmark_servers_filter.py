@@ -0,0 +1,146 @@
+"""Servers filter benchmark
+
+Builds the cached ServerList of scripts/benchmark_servers_pickling.py (servers of the sample get_server_list.php page in
+scripts/benchmark_data/servers.xml, duplicated under several addresses), then measures the time needed to filter it as
+the servers list page and the API do, using ServerList.filter() and the former filter walking the whole list.
+
+Usage (from the project root, with the same env variables as the app): python scripts/benchmark_servers_filter.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_servers_pickling import SERVERS, build_servers, build_server_list
+from app import app
+import timeit
+
+REPEAT = 20
+
+FILTERS = (
+    ('Location', {'location': 'fr'}),
+    ('Locations', {'location': 'continent:eu+us'}),
+    ('Type and mode', {'type': 'vanilla', 'mode': 'COOP'}),
+    ('Map, not empty', {'map': 'map4', 'not_empty': 'yes'}),
+    ('Ranked, not full', {'ranked': 'yes', 'not_full': 'yes'}),
+    ('Realm and username', {'database': 'invasion', 'username': 'PLAYER83230'}),
+    ('Location, limited', {'location': 'continent:as', 'limit': 5}),
+    ('Unmatched location', {'location': 'xx'}),
+)
+
+
+def former_filter_server(server, filters):
+    """The servers filter as it was before ServerList.filter(), walking the whole list."""
+    location = filters.get('location', 'any')
+    map = filters.get('map', 'any')
+    type = filters.get('type', 'any')
+    mode = filters.get('mode', 'any')
+    dedicated = filters.get('dedicated')
+    official = filters.get('official')
+    ranked = filters.get('ranked')
+    not_empty = filters.get('not_empty')
+    not_full = filters.get('not_full')
+    database = filters.get('database')
+    username = filters.get('username')
+
+    if database and database != server.database:
+        return False
+
+    if username and username not in server.players.list:
+        return False
+
+    if location != 'any':
+        location_list = location.split('+')
+        location_list_matches = []
+
+        for location_in_list in location_list:
+            if ':' in location_in_list:
+                location_type, location_code = location_in_list.split(':', maxsplit=1)
+            else:
+                location_type = 'country'
+                location_code = location_in_list
+
+            if location_type == 'continent':
+                location_list_matches.append(location_code == server.location.continent_code)
+            elif location_type == 'country':
+                location_list_matches.append(location_code == server.location.country_code)
+
+        if True not in location_list_matches:
+            return False
+
+    if map != 'any' and map != server.map.id:
+        return False
+
+    if type != 'any':
+        type_list = type.split('+')
+        type_list_matches = []
+
+        for type_in_list in type_list:
+            if type_in_list.startswith('vanilla'):
+                type_list_matches.append(server.type.startswith('vanilla'))
+            else:
+                type_list_matches.append(type_in_list == server.type)
+
+        if True not in type_list_matches:
+            return False
+
+    if mode != 'any' and mode != server.mode:
+        return False
+
+    if dedicated == 'yes' and not server.is_dedicated:
+        return False
+
+    if official == 'yes' and not server.is_official:
+        return False
+
+    if ranked == 'yes' and not server.is_ranked:
+        return False
+
+    if not_empty == 'yes' and server.players.current == 0:
+        return False
+
+    if not_full == 'yes' and server.players.free == 0:
+        return False
+
+    return True
+
+
+def former_filter(servers, filters):
+    """The servers list filtered as it was before ServerList.filter()."""
+    ret = [server for server in servers if former_filter_server(server, filters)]
+
+    limit = filters.get('limit')
+
+    if limit:
+        return ret[:limit]
+
+    return ret
+
+
+def measure(benchmark):
+    """Return the time (in ms) a call of the given benchmark takes."""
+    return min(timeit.repeat(benchmark, number=REPEAT, repeat=5)) / REPEAT * 1000
+
+
+def main():
+    with app.app_context():
+        server_list = build_server_list(build_servers())
+
+    print('{} servers, per call:'.format(SERVERS))
+    print('  {:<20} {:>8} {:>10} {:>10}'.format('Filters', 'Results', 'Former', 'Filter'))
+
+    for name, filters in FILTERS:
+        expected = former_filter(server_list, filters)
+
+        assert server_list.filter(filters) == expected, name
+
+        print('  {:<20} {:>8} {:>7.3f} ms {:>7.3f} ms'.format(
+            name,
+            len(expected),
+            measure(lambda: former_filter(server_list, filters)),
+            measure(lambda: server_list.filter(filters))
+        ))
+
+
+if __name__ == '__main__':
+    main()
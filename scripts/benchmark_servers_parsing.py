@@ -0,0 +1,64 @@
+"""Servers parsing benchmark
+
+Measures the per-row cost of building Server objects from the sample get_server_list.php page in
+scripts/benchmark_data/servers.xml: parsing a <server> node, then reading its link (as the servers list page does) or all of
+its URLs (as its details page does).
+
+Usage (from the project root, with the same env variables as the app): python scripts/benchmark_servers_parsing.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from rwr.server import Server
+from lxml import etree
+import timeit
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_data', 'servers.xml')
+REPEAT = 20
+
+
+def read_urls(server):
+    """Read every URL of the given server."""
+    return (
+        server.link,
+        server.link_absolute,
+        server.banner,
+        server.banner_absolute,
+        getattr(server.map, 'preview', None), # Only known if the map has a preview, until URLs were built lazily
+        getattr(server.map, 'preview_absolute', None),
+        getattr(server.map, 'minimap', None),
+        getattr(server.map, 'minimap_absolute', None),
+        getattr(server.location, 'flag', None),
+        getattr(server.location, 'flag_absolute', None)
+    )
+
+
+def main():
+    with open(SAMPLE_FILE, 'rb') as f:
+        server_nodes = etree.fromstring(f.read()).findall('server')
+
+    benchmarks = [
+        ('Server.load', lambda: [Server.load(server_node) for server_node in server_nodes]),
+        ('Server.load, then link read', lambda: [Server.load(server_node).link for server_node in server_nodes]),
+        ('Server.load, then URLs read', lambda: [read_urls(Server.load(server_node)) for server_node in server_nodes]),
+    ]
+
+    if hasattr(Server, 'from_record'): # Cached servers are rebuilt from records
+        records = [Server.load(server_node).to_record() for server_node in server_nodes]
+
+        benchmarks.append(('Server.from_record', lambda: [Server.from_record(record) for record in records]))
+
+    print('{} servers, per row:'.format(len(server_nodes)))
+
+    with app.test_request_context():
+        for name, benchmark in benchmarks:
+            benchmark() # Warm up
+
+            print('  {:<28} {:>8.1f} µs'.format(name, min(timeit.repeat(benchmark, number=REPEAT, repeat=5)) / REPEAT / len(server_nodes) * 1000000))
+
+
+if __name__ == '__main__':
+    main()
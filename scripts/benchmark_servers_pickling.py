@@ -0,0 +1,114 @@
+"""Cached servers list benchmark
+
+Builds a list of servers from the sample get_server_list.php page in scripts/benchmark_data/servers.xml (each server
+being duplicated under several addresses), then measures its pickled size and the time needed to unpickle it, as it is
+on every hit of the servers list cache. The whole cached ServerList (servers, lookup indexes and filter facets) is
+measured as well if available.
+
+Usage (from the project root, with the same env variables as the app): python scripts/benchmark_servers_pickling.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from rwr.server import Server
+from lxml import etree
+import timeit
+import pickle
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_data', 'servers.xml')
+SERVERS = 2000
+REPEAT = 20
+
+LOCATIONS = (
+    ('eu', 'Europe', 'fr', 'France', 'Paris'),
+    ('eu', 'Europe', 'de', 'Germany', 'Frankfurt am Main'),
+    ('na', 'North America', 'us', 'United States', 'Dallas'),
+    ('as', 'Asia', 'sg', 'Singapore', None),
+    ('oc', 'Oceania', 'au', 'Australia', 'Sydney'),
+)
+
+
+def build_servers():
+    """Return SERVERS servers parsed from the sample page, located as the scraper would."""
+    with open(SAMPLE_FILE, 'rb') as f:
+        server_nodes = etree.fromstring(f.read()).findall('server')
+
+    servers = []
+
+    for i in range(SERVERS):
+        server_node = server_nodes[i % len(server_nodes)]
+        server_node.find('address').text = '10.{}.{}.{}'.format(i // 65536 % 256, i // 256 % 256, i % 256)
+
+        server = Server.load(server_node)
+
+        (
+            server.location.continent_code,
+            server.location.continent_name,
+            server.location.country_code,
+            server.location.country_name,
+            server.location.city_name
+        ) = (sys.intern(value) if value else value for value in LOCATIONS[i % len(LOCATIONS)])
+
+        server.location.text = '{}{}'.format(
+            server.location.city_name + ', ' if server.location.city_name else '',
+            server.location.country_name
+        )
+
+        servers.append(server)
+
+    return servers
+
+
+def build_server_list(servers):
+    """Return a ServerList of the given servers, as cached by rwr.scraper.refresh_servers()."""
+    from rwr.server import ServerList
+    import rwr.scraper
+
+    all_servers = ServerList(servers)
+    all_servers.sort(key=lambda s: s.players.current, reverse=True)
+    all_servers.build_indexes()
+
+    all_servers.counters = (
+        sum(server.players.current for server in all_servers),
+        sum(1 for server in all_servers if server.players.current > 0),
+        len(all_servers)
+    )
+
+    all_servers.facets = {
+        'locations': rwr.scraper._compute_servers_locations(all_servers),
+        'types': rwr.scraper._compute_servers_types(all_servers),
+        'modes': rwr.scraper._compute_servers_modes(all_servers),
+        'maps': rwr.scraper._compute_servers_maps(all_servers),
+    }
+
+    return all_servers
+
+
+def measure(title, value):
+    """Print the pickled size of the given value and the time needed to unpickle it."""
+    pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    print(title)
+    print('  {:<12} {:>8.0f} KB'.format('Pickled size', len(pickled) / 1024))
+    print('  {:<12} {:>8.2f} ms'.format('Unpickling', min(timeit.repeat(lambda: pickle.loads(pickled), number=REPEAT, repeat=5)) / REPEAT * 1000))
+
+
+def main():
+    with app.app_context():
+        servers = build_servers()
+
+        measure('{} servers'.format(SERVERS), servers)
+
+        try:
+            server_list = build_server_list(servers)
+        except ImportError: # No ServerList yet
+            return
+
+        measure('ServerList of {} servers'.format(SERVERS), server_list)
+
+
+if __name__ == '__main__':
+    main()
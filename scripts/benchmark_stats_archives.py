@@ -0,0 +1,130 @@
+"""RwrAccountStat archives benchmark
+
+Fills a throwaway SQLite database with synthetic daily stats, then measures the storage size of the stats and the
+latency of the stats readers (paginated stats history, evolution charts, stats of a given date) before and after
+archiving all but the last 3 months of them.
+
+Usage (from the project root, with the same env variables as the app): python scripts/benchmark_stats_archives.py
+"""
+import tempfile
+import os
+
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite')
+
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from rwrs.models import RwrAccount, RwrAccountType, RwrAccountStat, RwrAccountStatArchive
+import timeit
+import random
+import arrow
+
+ACCOUNTS = 200
+DAYS = 2 * 365
+MONTHS_LEFT_UNARCHIVED = 3
+REPEAT = 50
+
+
+def fill():
+    """Insert ACCOUNTS RWR accounts having one RwrAccountStat per day during DAYS days."""
+    start = arrow.utcnow().floor('day').shift(days=-DAYS)
+    random.seed(0)
+
+    for i in range(ACCOUNTS):
+        rwr_account = RwrAccount(type=RwrAccountType.INVASION, username='PLAYER{}'.format(i))
+
+        db.session.add(rwr_account)
+        db.session.flush()
+
+        xp = kills = deaths = time_played = 0
+
+        for day in range(DAYS):
+            xp += random.randint(0, 500)
+            kills += random.randint(0, 100)
+            deaths += random.randint(0, 30)
+            time_played += random.randint(0, 3 * 3600)
+
+            rwr_account_stat = RwrAccountStat(
+                xp=xp,
+                kills=kills,
+                deaths=deaths,
+                time_played=time_played,
+                longest_kill_streak=random.randint(0, 50),
+                targets_destroyed=day,
+                vehicles_destroyed=day,
+                soldiers_healed=day,
+                teamkills=day // 10,
+                distance_moved=day * 1234.5,
+                shots_fired=kills * 20,
+                throwables_thrown=day,
+                rwr_account_id=rwr_account.id,
+                created_at=start.shift(days=day)
+            )
+
+            rwr_account_stat.compute_hash()
+
+            db.session.add(rwr_account_stat)
+
+        db.session.commit()
+
+
+def get_tables_size():
+    """Return the size, in bytes, of the stats tables and their indexes."""
+    db.session.commit()
+    db.session.execute(db.text('VACUUM'))
+
+    return db.session.execute(db.text(
+        "SELECT SUM(pgsize) FROM dbstat WHERE name IN ("
+        "'rwr_account_stats', 'rwr_account_id_idx', 'created_at_idx', "
+        "'rwr_account_stat_archives', 'rwr_account_id_month_idx'"
+        ")"
+    )).scalar()
+
+
+def measure(title):
+    """Print the stats tables size and the average latency of each stats reader."""
+    rwr_account = RwrAccount.query.filter(RwrAccount.username == 'PLAYER0').one()
+    old_date = arrow.utcnow().shift(days=-DAYS // 2)
+
+    readers = (
+        ('paginate_stats, first page', lambda: rwr_account.paginate_stats(1, 15)),
+        ('paginate_stats, archived page', lambda: rwr_account.paginate_stats(30, 15)),
+        ('get_evolution_series', lambda: RwrAccountStat.get_evolution_series.uncached(rwr_account.id, rwr_account.database)),
+        ('get_stats_for_date, archived date', lambda: RwrAccountStat.get_stats_for_date(rwr_account.id, old_date)),
+    )
+
+    print(title)
+    print('  {:<36} {:>10.1f} MB'.format('Stats tables size', get_tables_size() / 1024 / 1024))
+
+    for name, reader in readers:
+        db.session.expire_all()
+
+        print('  {:<36} {:>10.2f} ms'.format(name, timeit.timeit(reader, number=REPEAT) / REPEAT * 1000))
+
+
+def main():
+    with app.app_context():
+        db.create_all()
+
+        print('Filling {} RWR accounts with {} days of stats'.format(ACCOUNTS, DAYS))
+
+        fill()
+
+        measure('Before archiving')
+
+        before = arrow.utcnow().floor('month').shift(months=-MONTHS_LEFT_UNARCHIVED)
+        rwr_account_ids = [rwr_account_id for rwr_account_id, in db.session.query(RwrAccount.id).all()]
+
+        archived = RwrAccountStatArchive.archive(rwr_account_ids, before)
+
+        db.session.commit()
+
+        print('Archived {} stats'.format(archived))
+
+        measure('After archiving')
+
+
+if __name__ == '__main__':
+    main()
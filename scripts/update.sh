@@ -32,6 +32,10 @@ echo "Pulling latest code version"
 
 git pull
 
+echo "Clearing cache"
+
+flask cc
+
 echo "Restarting site"
 
 status=$(curl --basic --user "${ALWAYSDATA_API_TOKEN} account=${ALWAYSDATA_ACCOUNT_NAME}:" --data '' --request POST --silent --output /dev/null --write-out '%{http_code}' "https://api.alwaysdata.com/v1/site/${ALWAYSDATA_SITE_ID}/restart/")
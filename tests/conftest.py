@@ -0,0 +1,33 @@
+from steam.webapi import WebAPI
+import tempfile
+import pytest
+import os
+
+_tmp_dir = tempfile.mkdtemp(prefix='rwrs-tests-')
+
+for name, value in {
+    'SECRET_KEY': 'tests',
+    'DISCORD_INTERACTIONS_PATH': '/discord/interactions',
+    'STEAM_API_KEY': 'tests',
+    'DISCORD_CLIENT_ID': '1',
+    'DISCORD_PUBLIC_KEY': '0' * 64,
+    'DISCORD_CLIENT_SECRET': 'tests',
+    'DISCORD_GUILD': '1',
+    'CACHE_DIR': os.path.join(_tmp_dir, 'cache'),
+    'SCRAPER_LOCKS_DIR': os.path.join(_tmp_dir, 'locks'),
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+}.items():
+    os.environ.setdefault(name, value)
+
+# The Steam Web API interfaces are fetched when the app is loaded: don't hit the network
+WebAPI.fetch_interfaces = lambda self: {'apilist': {'interfaces': [{'name': 'ISteamUserStats', 'methods': []}]}}
+
+from app import app as flask_app, cache
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        cache.clear()
+
+        yield flask_app
@@ -0,0 +1,182 @@
+from rwr import caching
+from app import cache
+import threading
+import time
+import os
+
+
+def _wait_for_background_refreshes():
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and thread.daemon:
+            thread.join(timeout=5)
+
+
+def test_single_flight_computes_on_miss(app):
+    calls = []
+
+    def compute():
+        calls.append(1)
+
+        return caching.store('key', 'value', 60)
+
+    assert caching.single_flight('key', compute) == 'value'
+    assert caching.single_flight('key', compute) == 'value'
+    assert len(calls) == 1
+
+
+def test_lock_is_exclusive(app):
+    lock = caching.Lock('key')
+    other_lock = caching.Lock('key')
+
+    assert lock.acquire()
+    assert not other_lock.acquire()
+
+    lock.release()
+
+    assert other_lock.acquire()
+
+    other_lock.release()
+
+
+def test_locks_are_spread_over_a_fixed_number_of_files(app, tmp_path, monkeypatch):
+    from rwr.scraper import SERVERS_CACHE_KEY
+    from rwrs import header
+
+    monkeypatch.setitem(app.config, 'SCRAPER_LOCKS_DIR', str(tmp_path))
+
+    for i in range(1000):
+        lock = caching.Lock('key{}'.format(i))
+
+        assert lock.acquire()
+
+        lock.release()
+
+    assert 0 < len(os.listdir(tmp_path)) <= caching.LOCK_FILES
+
+    # The header is computed while holding its lock, from the servers list which is locked as well
+    assert caching.Lock(header.CACHE_KEY).path != caching.Lock(SERVERS_CACHE_KEY).path
+
+
+def test_single_flight_retries_once_failed_refresh_expired(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SCRAPER_LOCK_TIMEOUT', 1)
+
+    caching.remember('key', 'stale')
+
+    calls = []
+
+    def failing_compute():
+        calls.append('failing')
+
+        raise RuntimeError('Upstream is down')
+
+    # Stale data is served while the refresh fails in the background
+    assert caching.single_flight('key', failing_compute) == 'stale'
+
+    _wait_for_background_refreshes()
+
+    # Upstream isn't retried until the failure expires
+    assert caching.single_flight('key', failing_compute) == 'stale'
+
+    _wait_for_background_refreshes()
+
+    assert calls == ['failing']
+
+    time.sleep(1.5)
+
+    def compute():
+        calls.append('succeeding')
+
+        return caching.store('key', 'fresh', 60)
+
+    assert caching.single_flight('key', compute) == 'stale'
+
+    _wait_for_background_refreshes()
+
+    assert calls == ['failing', 'succeeding']
+    assert caching.single_flight('key', compute) == 'fresh'
+
+
+def test_only_late_or_failed_refreshes_are_flagged_as_stale(app, monkeypatch):
+    from flask import g
+
+    monkeypatch.setitem(app.config, 'SCRAPER_LOCK_TIMEOUT', 1)
+
+    def failing_compute():
+        raise RuntimeError('Upstream is down')
+
+    caching.store('key', 'value', 60)
+    cache.delete('key') # Routine expiry
+
+    with app.test_request_context():
+        assert caching.single_flight('key', failing_compute) == 'value'
+        assert not g.get('STALE_DATA')
+
+    _wait_for_background_refreshes()
+
+    with app.test_request_context():
+        assert caching.single_flight('key', failing_compute) == 'value'
+        assert g.STALE_DATA
+
+    caching.remember('other_key', 'value', -2) # Expired longer than a refresh should take
+
+    with app.test_request_context():
+        assert caching.single_flight('other_key', lambda: caching.store('other_key', 'fresh', 60)) == 'value'
+        assert g.STALE_DATA
+
+    _wait_for_background_refreshes()
+
+
+def test_single_flight_takes_over_after_lock_owner_failure(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SCRAPER_LOCK_TIMEOUT', 5)
+
+    lock = caching.Lock('key')
+
+    assert lock.acquire()
+
+    # The lock owner fails (or dies) without caching anything
+    threading.Timer(0.3, lock.release).start()
+
+    assert caching.single_flight('key', lambda: caching.store('key', 'value', 60)) == 'value'
+    assert cache.get('key') == 'value'
+
+
+def test_single_flight_memoized_serves_stale_after_failure(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SCRAPER_LOCK_TIMEOUT', 1)
+
+    results = ['value', RuntimeError('Upstream is down'), 'fresh']
+    calls = []
+
+    @caching.single_flight_memoized
+    @cache.memoize(timeout=60)
+    def get(arg):
+        calls.append(arg)
+
+        result = results.pop(0)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    assert get('arg') == 'value'
+    assert get('arg') == 'value'
+
+    memoized_get = get.__wrapped__
+
+    cache.delete(memoized_get.make_cache_key(memoized_get.uncached, 'arg')) # Expires
+
+    assert get('arg') == 'value' # Stale
+
+    _wait_for_background_refreshes()
+
+    assert calls == ['arg', 'arg']
+    assert get('arg') == 'value' # Still stale, the failure isn't expired yet
+
+    time.sleep(1.5)
+
+    get('arg')
+
+    _wait_for_background_refreshes()
+
+    assert get('arg') == 'fresh'
+    assert calls == ['arg', 'arg', 'arg']
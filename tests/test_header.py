@@ -0,0 +1,59 @@
+from werkzeug.exceptions import ServiceUnavailable
+from app import before_request, db
+from flask import g
+from rwrs import header
+import pytest
+
+
+@pytest.fixture
+def app(app, monkeypatch):
+    db.create_all()
+
+    def get():
+        raise AssertionError('The header must not be computed')
+
+    monkeypatch.setattr(header, 'get', get)
+
+    yield app
+
+    db.drop_all()
+
+
+def test_header_not_computed_for_discord_interactions(app):
+    with app.test_request_context(app.config['DISCORD_INTERACTIONS_PATH'], method='POST'):
+        before_request()
+
+
+def test_header_not_computed_under_maintenance(app, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+    (tmp_path / 'maintenance').touch()
+
+    with app.test_request_context('/'):
+        with pytest.raises(ServiceUnavailable):
+            before_request()
+
+
+def test_notices_are_cached_until_changed(app, monkeypatch, tmp_path):
+    from rwrs import motd
+
+    monkeypatch.chdir(tmp_path)
+
+    with app.test_request_context(app.config['DISCORD_INTERACTIONS_PATH'], method='POST'):
+        before_request()
+
+        assert g.MOTD is None
+
+    motd.set('info', 'Hello')
+
+    with app.test_request_context(app.config['DISCORD_INTERACTIONS_PATH'], method='POST'):
+        before_request()
+
+        assert g.MOTD is None # Not read again until the notices expire or are cleared
+
+    header.clear()
+
+    with app.test_request_context(app.config['DISCORD_INTERACTIONS_PATH'], method='POST'):
+        before_request()
+
+        assert g.MOTD.message == 'Hello'
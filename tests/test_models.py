@@ -0,0 +1,129 @@
+from rwrs.models import RwrAccount, ServerPlayerCount, ServerPlayerCountRollup, SteamPlayerCount, one_week_ago, period_start
+from app import db
+import pytest
+import arrow
+
+
+@pytest.fixture
+def database(app):
+    db.create_all()
+
+    yield db
+
+    db.session.remove()
+    db.drop_all()
+
+
+def test_old_entries_are_deleted_by_batches(database):
+    now = one_week_ago().shift(weeks=1)
+
+    for minutes in range(0, 14 * 24 * 60, 60):
+        database.session.add(SteamPlayerCount(measured_at=now.shift(minutes=-minutes), count=minutes))
+
+    database.session.commit()
+
+    old_count = SteamPlayerCount.query.filter(SteamPlayerCount.measured_at < one_week_ago()).count()
+    batches_deleted_count = []
+
+    for batch in SteamPlayerCount.get_old_entries_batches(batch_size=50):
+        batches_deleted_count.append(batch.delete(synchronize_session=False))
+
+        database.session.commit()
+
+    assert all(count <= 50 for count in batches_deleted_count)
+    assert sum(batches_deleted_count) == old_count
+    assert SteamPlayerCount.query.count() == 14 * 24 - old_count
+    assert SteamPlayerCount.query.filter(SteamPlayerCount.measured_at < one_week_ago()).count() == 0
+
+
+def test_players_count_rollups_are_upserted(database):
+    measured_at = arrow.get('2026-10-18T10:02:00+00:00')
+
+    ServerPlayerCountRollup.add_measures(measured_at, {('127.0.0.1', 1234): 10, ('127.0.0.1', 1235): 0})
+    ServerPlayerCountRollup.add_measures(measured_at.shift(minutes=1), {('127.0.0.1', 1234): 4, ('127.0.0.1', 1235): 2})
+
+    database.session.commit()
+
+    rollups = {
+        (rollup.period, rollup.ip, rollup.port): rollup for rollup in ServerPlayerCountRollup.query.all()
+    }
+
+    assert len(rollups) == 3 * len(ServerPlayerCountRollup.PERIODS)
+
+    for period, _ in ServerPlayerCountRollup.PERIODS:
+        server_rollup = rollups[(period, '127.0.0.1', 1234)]
+        all_servers_rollup = rollups[(period, '', 0)]
+
+        assert server_rollup.period_start == period_start(measured_at, period)
+        assert (server_rollup.samples, server_rollup.players_sum, server_rollup.players_max) == (2, 14, 10)
+        assert (all_servers_rollup.samples, all_servers_rollup.players_sum, all_servers_rollup.players_max) == (2, 16, 10)
+        assert (all_servers_rollup.servers_sum, all_servers_rollup.active_servers_sum) == (4, 3)
+
+
+def test_steam_players_count_is_averaged_like_rollups(app, database):
+    start = period_start(one_week_ago().shift(days=1), app.config['GRAPHS_DATA_PERIOD'])
+
+    for minutes, count in ((0, 10), (1, 20), (60, 30)):
+        database.session.add(SteamPlayerCount(measured_at=start.shift(minutes=minutes), count=count))
+
+    database.session.commit()
+
+    assert SteamPlayerCount.query.get_player_count() == [(start, 15), (start.shift(hours=1), 30)]
+
+
+def test_players_count_rollups_are_recomputed_by_batches(app, database):
+    from rwrs.commands import compute_players_count_rollups
+
+    start = arrow.utcnow().floor('hour').shift(hours=-2, minutes=-10)
+
+    for minutes in range(30):
+        servers_count = {('127.0.0.1', port): (minutes * port) % 7 for port in range(1234, 1238)}
+
+        for (ip, port), count in servers_count.items():
+            database.session.add(ServerPlayerCount(measured_at=start.shift(minutes=minutes), ip=ip, port=port, count=count))
+
+        ServerPlayerCountRollup.add_measures(start.shift(minutes=minutes), servers_count)
+
+    # Rollups of periods older than the players count still stored
+    ServerPlayerCountRollup.add_measures(start.shift(days=-3), {('127.0.0.1', 1234): 5})
+    ServerPlayerCountRollup.add_measures(start.shift(weeks=-3), {('127.0.0.1', 1234): 3})
+
+    database.session.commit()
+
+    def get_rollups():
+        return sorted(
+            (rollup.period, rollup.period_start, rollup.ip, rollup.port, rollup.samples, rollup.players_sum, rollup.players_max, rollup.servers_sum, rollup.active_servers_sum)
+            for rollup in ServerPlayerCountRollup.query.all()
+        )
+
+    expected_rollups = get_rollups()
+
+    def get_rollup(period):
+        return ServerPlayerCountRollup.query.filter_by(period=period, period_start=period_start(start, period), port=1234).one()
+
+    # A fully covered period gets fixed, while the partially covered one the oldest players count is part of is kept as is
+    get_rollup(300).players_sum += 100
+    get_rollup(3600).players_sum += 100
+    database.session.commit()
+
+    result = app.test_cli_runner().invoke(compute_players_count_rollups, ['--batch-size', '10'], input='y\n')
+
+    assert result.exit_code == 0, result.output
+
+    get_rollup(3600).players_sum -= 100
+    database.session.commit()
+
+    assert get_rollups() == expected_rollups
+
+
+def test_rwr_accounts_are_upserted(database):
+    RwrAccount.upsert_many_by_type_and_usernames('invasion', ['ALICE', 'BOB'])
+    database.session.commit()
+
+    ids = RwrAccount.get_ids_by_type_and_usernames('invasion', ['ALICE', 'BOB'])
+
+    RwrAccount.upsert_many_by_type_and_usernames('invasion', ['BOB', 'CHARLIE', 'CHARLIE'], update_existing=False)
+    database.session.commit()
+
+    assert RwrAccount.query.count() == 3
+    assert RwrAccount.get_ids_by_type_and_usernames('invasion', ['ALICE', 'BOB']) == ids
@@ -0,0 +1,169 @@
+from rwrs.commands import refresh_players
+from rwr.player import Player
+from rwr import constants
+from lxml import html
+import rwr.scraper
+import io
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class FakeResponse:
+    """A requests' streamed response to a view_players.php call, served as UTF-8 without charset like the real one."""
+    class Raw(io.BytesIO):
+        decode_content = False
+
+    def __init__(self, content):
+        self.raw = self.Raw(content)
+        self.encoding = 'ISO-8859-1' # What requests infers for text/html without charset
+        self.text = content.decode(self.encoding)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def serve_players_pages(monkeypatch):
+    """Serve the full view_players.php fixture page, then the last one, then an empty one. Return the requests params."""
+    pages = {
+        0: read_fixture('view_players_full.html'),
+        100: read_fixture('view_players_last.html'),
+    }
+
+    requested = []
+
+    def fake_get(url, params=None, auth=None, verify=True, stream=False):
+        requested.append(params)
+
+        return FakeResponse(pages.get(params['start'], b'<html><body><table><tr><th>#</th></tr></table></body></html>'))
+
+    monkeypatch.setattr(rwr.scraper, '_get', fake_get)
+
+    return requested
+
+
+def parse_with_former_parser(content):
+    """Parse a view_players.php page as before _iter_html_rows: the whole text decoded by requests, queried by XPath, then
+    usernames decoded again as UTF-8."""
+    rows = []
+
+    for node in html.fromstring(FakeResponse(content).text).xpath('//table/tr[position() > 1]'):
+        cells = [cell.text for cell in node]
+        cells[1] = cells[1].encode('iso-8859-1').decode('utf-8')
+
+        rows.append(tuple(cells))
+
+    return rows
+
+
+def test_players_rows_are_parsed_as_before(app, monkeypatch):
+    for fixture in ('view_players_full.html', 'view_players_last.html'):
+        content = read_fixture(fixture)
+
+        monkeypatch.setattr(rwr.scraper, '_get', lambda *args, **kwargs: FakeResponse(content))
+
+        rows = list(rwr.scraper._iter_html_rows(rwr.scraper.players_base_url + 'view_players.php'))
+
+        assert rows == parse_with_former_parser(content)
+        assert len(rows) == (100 if fixture == 'view_players_full.html' else 37)
+
+    players = [Player.load('invasion', row) for row in rows]
+
+    assert players[0].leaderboard_position == 101
+    assert {'ДМИТРИЙ 102', '李小龍 123', 'TOM & JERRY 105', 'ΑΛΈΞΑΝΔΡΟΣ 108', 'NGUYỄN 129'} <= {player.username for player in players}
+
+
+def test_players_lists_end_at_their_short_last_page(app, monkeypatch):
+    requested = serve_players_pages(monkeypatch)
+
+    players = rwr.scraper.get_players('invasion', start=90, limit=50)
+
+    assert [player.leaderboard_position for player in players] == list(range(91, 138))
+    assert [params['start'] for params in requested] == [0, 100]
+
+    refreshed = list(rwr.scraper.iter_refreshed_players_blocks(['invasion'], constants.PlayersSort.SCORE.value, 500))
+
+    assert [(database, start, len(rows)) for database, start, rows in refreshed] == [('invasion', 0, 100), ('invasion', 100, 37)]
+
+
+def test_only_requested_players_sorts_are_refreshed(app, monkeypatch):
+    monkeypatch.setattr(rwr.scraper, '_get_players_rows', lambda database, sort, start, limit: [])
+
+    rwr.scraper.get_players('invasion', sort=constants.PlayersSort.KILLS.value)
+    rwr.scraper.get_players('invasion', sort=constants.PlayersSort.KILLS.value, start=20)
+    rwr.scraper.get_players('pacific', sort=constants.PlayersSort.XP.value)
+    rwr.scraper.get_players('pacific', sort=constants.PlayersSort.DEATHS.value, start=app.config['PLAYERS_MIRROR_SIZE']) # Beyond the mirror
+
+    refreshed = []
+
+    def fake_refresh_players(database, sort, count, concurrency=1):
+        refreshed.append((database, sort))
+
+        return 0
+
+    monkeypatch.setattr(rwr.scraper, 'refresh_players', fake_refresh_players)
+
+    result = app.test_cli_runner().invoke(refresh_players)
+
+    assert result.exit_code == 0, result.output
+    assert sorted(refreshed) == [
+        ('invasion', constants.PlayersSort.KILLS.value),
+        ('invasion', constants.PlayersSort.SCORE.value),
+        ('pacific', constants.PlayersSort.XP.value),
+        ('pacific', constants.PlayersSort.SCORE.value),
+    ]
+
+
+def test_geoip_db_lookups_use_the_reader_they_were_given(app, tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    class FakeReader:
+        opened = []
+
+        def __init__(self, path, mode=None):
+            self.closed = False
+            self.lookups = []
+            self.name = 'Reader {}'.format(len(self.opened) + 1)
+
+            self.opened.append(self)
+
+        def city(self, ip):
+            self.lookups.append(ip)
+
+            place = SimpleNamespace(geoname_id=1, code='EU', iso_code='FR', names={'en': self.name})
+
+            return SimpleNamespace(continent=place, country=place, city=place)
+
+        def close(self):
+            self.closed = True
+
+    geoip_db_file = tmp_path / 'GeoLite2-City.mmdb'
+    geoip_db_file.write_bytes(b'')
+
+    monkeypatch.setitem(app.config, 'GEOIP_DATABASE_FILE', str(geoip_db_file))
+    monkeypatch.setattr(rwr.scraper.geoip2.database, 'Reader', FakeReader)
+    monkeypatch.setattr(rwr.scraper, '_geoip_db_lookup', None)
+
+    get_ip_location = rwr.scraper._get_geoip_db_lookup()
+
+    assert get_ip_location('10.0.0.1') == get_ip_location('10.0.0.1') == ('eu', 'Reader 1', 'fr', 'Reader 1', 'Reader 1')
+    assert rwr.scraper._get_geoip_db_lookup() is get_ip_location
+
+    os.utime(geoip_db_file, (0, 0)) # The database is updated
+
+    new_get_ip_location = rwr.scraper._get_geoip_db_lookup()
+
+    assert new_get_ip_location('10.0.0.1') == ('eu', 'Reader 2', 'fr', 'Reader 2', 'Reader 2')
+
+    # Lookups in progress with the former reader keep working
+    assert get_ip_location('10.0.0.2') == ('eu', 'Reader 1', 'fr', 'Reader 1', 'Reader 1')
+    assert [reader.lookups for reader in FakeReader.opened] == [['10.0.0.1', '10.0.0.2'], ['10.0.0.1']]
+    assert not FakeReader.opened[0].closed
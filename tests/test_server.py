@@ -0,0 +1,202 @@
+from rwr.server import Server, ServerList
+import itertools
+import random
+
+LOCATIONS = (
+    (None, None, None, None, None, None),
+    ('eu', 'Europe', 'fr', 'France', 'Paris', 'Paris, France'),
+    ('eu', 'Europe', 'de', 'Germany', None, 'Germany'),
+    ('na', 'North America', 'us', 'United States', 'Dallas', 'Dallas, United States'),
+    ('as', 'Asia', 'sg', 'Singapore', None, 'Singapore'),
+)
+
+MAPS = (
+    ('vanilla', 'map1'),
+    ('vanilla.winter', 'map4'),
+    ('vanilla.desert', 'map6'),
+    ('pacific', 'island1'),
+    ('edelweiss', 'edelweiss2'),
+    ('man_vs_world_mp', 'lobby_2p'),
+)
+
+FILTERS_GRID = {
+    'location': ('any', 'fr', 'continent:eu', 'fr+us', 'continent:as+de', 'xx', 'planet:earth'),
+    'map': ('any', 'map1', 'island1'),
+    'type': ('any', 'vanilla', 'vanilla.winter', 'pacific+vanilla', 'edelweiss'),
+    'mode': ('any', 'COOP', 'PvP'),
+    'database': (None, 'invasion', 'pacific'),
+}
+
+FLAGS = ('dedicated', 'official', 'ranked', 'not_empty', 'not_full')
+
+
+def build_server_list():
+    """Return a synthetic ServerList covering every location, map, mode, realm and players count combination."""
+    server_random = random.Random(0)
+    servers = []
+
+    for i in range(300):
+        server_type, map_id = server_random.choice(MAPS)
+        max_players = server_random.choice((8, 16))
+        current_players = server_random.choice((0, max_players, server_random.randrange(max_players + 1)))
+
+        servers.append(Server.from_record((
+            'Server #{}'.format(i),
+            '10.0.{}.{}'.format(i // 256, i % 256),
+            1234,
+            server_type,
+            map_id,
+            0,
+            current_players,
+            max_players,
+            tuple(sorted('PLAYER{}'.format(server_random.randrange(50)) for _ in range(current_players))),
+            '1.97',
+            server_random.random() < 0.8,
+            None,
+            None,
+            server_random.choice(('COOP', 'DOM', 'PvP')),
+            server_random.choice(('', 'official_invasion', 'official_pacific', 'official_dominance')),
+            False,
+            server_random.choice(LOCATIONS),
+            None
+        )))
+
+    server_list = ServerList(servers)
+    server_list.sort(key=lambda s: s.players.current, reverse=True)
+    server_list.build_indexes()
+
+    return server_list
+
+
+def former_filter_server(server, filters):
+    """The servers filter as it was before ServerList.filter(), walking the whole list."""
+    location = filters.get('location', 'any')
+    map = filters.get('map', 'any')
+    type = filters.get('type', 'any')
+    mode = filters.get('mode', 'any')
+    dedicated = filters.get('dedicated')
+    official = filters.get('official')
+    ranked = filters.get('ranked')
+    not_empty = filters.get('not_empty')
+    not_full = filters.get('not_full')
+    database = filters.get('database')
+    username = filters.get('username')
+
+    if database and database != server.database:
+        return False
+
+    if username and username not in server.players.list:
+        return False
+
+    if location != 'any':
+        location_list = location.split('+')
+        location_list_matches = []
+
+        for location_in_list in location_list:
+            if ':' in location_in_list:
+                location_type, location_code = location_in_list.split(':', maxsplit=1)
+            else:
+                location_type = 'country'
+                location_code = location_in_list
+
+            if location_type == 'continent':
+                location_list_matches.append(location_code == server.location.continent_code)
+            elif location_type == 'country':
+                location_list_matches.append(location_code == server.location.country_code)
+
+        if True not in location_list_matches:
+            return False
+
+    if map != 'any' and map != server.map.id:
+        return False
+
+    if type != 'any':
+        type_list = type.split('+')
+        type_list_matches = []
+
+        for type_in_list in type_list:
+            if type_in_list.startswith('vanilla'):
+                type_list_matches.append(server.type.startswith('vanilla'))
+            else:
+                type_list_matches.append(type_in_list == server.type)
+
+        if True not in type_list_matches:
+            return False
+
+    if mode != 'any' and mode != server.mode:
+        return False
+
+    if dedicated == 'yes' and not server.is_dedicated:
+        return False
+
+    if official == 'yes' and not server.is_official:
+        return False
+
+    if ranked == 'yes' and not server.is_ranked:
+        return False
+
+    if not_empty == 'yes' and server.players.current == 0:
+        return False
+
+    if not_full == 'yes' and server.players.free == 0:
+        return False
+
+    return True
+
+
+def former_filter(servers, filters):
+    ret = [server for server in servers if former_filter_server(server, filters)]
+
+    limit = filters.get('limit')
+
+    if limit:
+        return ret[:limit]
+
+    return ret
+
+
+def test_filter_matches_former_filter():
+    server_list = build_server_list()
+    matched_filters = 0
+
+    for i, values in enumerate(itertools.product(*FILTERS_GRID.values())):
+        filters = dict(zip(FILTERS_GRID.keys(), values))
+
+        # Every combination of the yes/no flags is cycled through the facets combinations
+        for j, flag in enumerate(FLAGS):
+            if i >> j & 1:
+                filters[flag] = 'yes'
+
+        if i % 3 == 1:
+            filters['username'] = 'PLAYER{}'.format(i % 50)
+
+        if i % 4 == 2:
+            filters['limit'] = 3
+
+        expected = former_filter(server_list, filters)
+
+        assert server_list.filter(filters) == expected, filters
+
+        if expected:
+            matched_filters += 1
+
+    assert matched_filters > 100 # The grid doesn't only exercise empty results
+
+
+def test_searches_match_former_walks():
+    server_list = build_server_list()
+
+    for name in ('server #1', 'SERVER #12', '#29', 'erver', 'unknown', ''):
+        former_server = next((server for server in server_list if name.lower() in server.name.lower()), None)
+
+        assert server_list.search_by_name(name) is former_server
+
+    for username in ('player1', 'PLAYER4', 'layer', 'yer2', 'nobody'):
+        former_username, former_server = None, None
+
+        for server in server_list:
+            for player in server.players.list:
+                if username.lower() in player.lower():
+                    former_username, former_server = player.lower(), server
+
+        assert server_list.search_by_player(username) == (former_username, former_server)
@@ -0,0 +1,149 @@
+from rwrs.models import RwrAccount, RwrAccountType, RwrAccountStat, RwrAccountStatArchive
+from app import db
+import pytest
+import arrow
+
+# One stat every 10 days, the XP crossing a rank threshold (500, 1000, 2000, ...) every few stats
+XP_HISTORY = [0, 200, 450, 600, 900, 1200, 1500, 1900, 2100, 2500, 2900, 3100, 3300, 3600, 4200, 4800, 5200, 5600]
+
+
+def expected_promotions():
+    import rwr.utils
+
+    rank_ids = [rwr.utils.get_rank_id_from_xp('invasion', xp) for xp in XP_HISTORY]
+
+    return [None] + [current if current != previous else None for previous, current in zip(rank_ids, rank_ids[1:])]
+
+
+@pytest.fixture
+def rwr_account(app):
+    db.create_all()
+
+    rwr_account = RwrAccount(type=RwrAccountType.INVASION, username='ALICE')
+
+    db.session.add(rwr_account)
+    db.session.flush()
+
+    start = arrow.utcnow().floor('day').shift(days=-10 * (len(XP_HISTORY) - 1))
+
+    for i, (xp, promoted_to_rank_id) in enumerate(zip(XP_HISTORY, expected_promotions())):
+        rwr_account_stat = RwrAccountStat(
+            xp=xp,
+            kills=i * 10,
+            deaths=i * 3,
+            time_played=i * 3600,
+            longest_kill_streak=i,
+            targets_destroyed=i,
+            vehicles_destroyed=i,
+            soldiers_healed=i,
+            teamkills=i,
+            distance_moved=i * 1234.5,
+            shots_fired=i * 100,
+            throwables_thrown=i,
+            promoted_to_rank_id=promoted_to_rank_id,
+            rwr_account_id=rwr_account.id,
+            created_at=start.shift(days=10 * i)
+        )
+
+        rwr_account_stat.compute_hash()
+
+        db.session.add(rwr_account_stat)
+
+    db.session.commit()
+
+    yield rwr_account
+
+    db.session.remove()
+    db.drop_all()
+
+
+def get_history(rwr_account):
+    return [
+        (rwr_account_stat.created_at, rwr_account_stat.xp, rwr_account_stat.kills, rwr_account_stat.distance_moved, rwr_account_stat.promoted_to_rank_id, rwr_account_stat.hash)
+        for rwr_account_stat in rwr_account.paginate_stats(1, 1000).items
+    ]
+
+
+def archive(rwr_account, months_ago=2, before=None):
+    archived = RwrAccountStatArchive.archive([rwr_account.id], before or arrow.utcnow().floor('month').shift(months=-months_ago))
+
+    db.session.commit()
+
+    return archived
+
+
+def test_archived_stats_are_read_transparently(app, rwr_account):
+    history = get_history(rwr_account)
+    evolution = RwrAccountStat.get_evolution_series.uncached(rwr_account.id, 'invasion')
+    stats_for_dates = [
+        RwrAccountStat.get_stats_for_date(rwr_account.id, created_at.shift(days=1)).xp for created_at, *_ in history
+    ]
+
+    assert archive(rwr_account) > 0
+
+    assert RwrAccountStatArchive.query.count() > 0
+    assert get_history(rwr_account) == history
+
+    for per_page in (1, 4, 7):
+        pages = [rwr_account.paginate_stats(page, per_page) for page in range(1, len(history) // per_page + 2)]
+
+        assert [item.xp for page in pages for item in page.items] == [row[1] for row in history]
+        assert all(page.total == len(history) for page in pages)
+
+    archived_evolution = RwrAccountStat.get_evolution_series.uncached(rwr_account.id, 'invasion')
+
+    for column in ('created_at', 'kd_ratio', 'score'):
+        assert archived_evolution[column].tolist() == evolution[column].tolist()
+
+    assert archived_evolution['promoted_to_rank'] == evolution['promoted_to_rank']
+    assert [
+        RwrAccountStat.get_stats_for_date(rwr_account.id, created_at.shift(days=1)).xp for created_at, *_ in history
+    ] == stats_for_dates
+
+
+def test_archives_are_merged(rwr_account):
+    history = get_history(rwr_account)
+
+    archive(rwr_account, months_ago=4)
+    archive(rwr_account, months_ago=1)
+    archive(rwr_account, months_ago=-1)
+
+    assert get_history(rwr_account) == history
+    assert RwrAccountStat.query.count() == 1 # The latest one is never archived
+
+
+def test_promotions_are_recomputed_after_archiving(app, rwr_account):
+    from rwrs.commands import compute_promotions
+
+    first_promotion = expected_promotions().index(4)
+
+    # The first non-archived stat is a promotion
+    archive(rwr_account, before=arrow.utcnow().floor('day').shift(days=-10 * (len(XP_HISTORY) - 1 - first_promotion)))
+
+    assert RwrAccountStat.query.order_by(RwrAccountStat.created_at.asc()).first().xp == XP_HISTORY[first_promotion]
+
+    RwrAccountStat.query.update({RwrAccountStat.promoted_to_rank_id: None})
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(compute_promotions)
+
+    assert result.exit_code == 0, result.output
+    assert [row[4] for row in get_history(rwr_account)][::-1] == expected_promotions()
+
+
+def test_archived_stats_are_never_persisted(rwr_account):
+    history = get_history(rwr_account)
+
+    archive(rwr_account)
+
+    live_count = RwrAccountStat.query.count()
+    archived_rwr_account_stat = RwrAccountStat.get_stats_for_date(rwr_account.id, history[-1][0])
+
+    assert archived_rwr_account_stat.id is None
+    assert archived_rwr_account_stat.rwr_account is rwr_account
+
+    archived_rwr_account_stat.rwr_account = rwr_account # As done by the Discord stats command
+
+    db.session.commit()
+
+    assert RwrAccountStat.query.count() == live_count